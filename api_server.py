@@ -0,0 +1,217 @@
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from superstore_data import (DASHBOARD_AGGREGATE_COLUMNS, DATA_PATH, SOURCES, dashboard_aggregates, load_data,
+                             select_rows, sparse_pivot, sparse_pivot_columns, to_records, validate_pivot)
+
+# ==================== HEADLESS AGGREGATE API ====================
+# Serves the same numbers as the dashboard as JSON, without Streamlit:
+#
+#   python api_server.py --port 8502
+#   GET  /health
+#   GET  /aggregates?region=West&region=East&year=2016&category=Technology&segment=Consumer
+#   POST /aggregates/batch   {"filters": [{"region": ["West"], "year": [2016]}, ...]}
+#   GET  /pivot?rows=State&columns=Sub-Category&measure=Profit&row_limit=20&column_limit=12&region=West
+#
+# Each filter may be repeated or comma separated; a missing filter means "all values".
+# Responses carry an ETag derived from the data version and the filter, so polling
+# clients sending If-None-Match get a 304 without anything being recomputed.
+
+API_VERSION = "1"
+
+# Query parameter -> superstore_data.select_rows() keyword
+FILTER_PARAMS = {
+    "region": "regions",
+    "year": "years",
+    "category": "categories",
+    "segment": "segments",
+}
+
+
+def parse_filters(params):
+    filters = {}
+    for param, keyword in FILTER_PARAMS.items():
+        raw = params.get(param)
+        if raw is None:
+            continue
+        if not isinstance(raw, list):
+            raw = [raw]
+        values = []
+        for item in raw:
+            # Lists/objects would otherwise be stringified into a value that silently matches nothing
+            if not isinstance(item, (str, int, float)) or isinstance(item, bool):
+                raise ValueError(f"'{param}' values must be strings or numbers")
+            values.extend(value.strip() for value in str(item).split(","))
+        values = [value for value in values if value]
+        if param == "year":
+            values = [int(value) for value in values]
+        filters[keyword] = sorted(set(values))
+    return filters
+
+
+def parse_pivot_options(params):
+    def single(name, default=None):
+        values = params.get(name)
+        return values[0] if values else default
+
+    options = {
+        "rows": single("rows", "Sub-Category"),
+        "columns": single("columns", "Category"),
+        "measure": single("measure", "Profit"),
+        "facet": single("facet"),
+        "row_limit": int(single("row_limit", 20)),
+        "column_limit": int(single("column_limit", 12)),
+    }
+    if options["row_limit"] < 1 or options["column_limit"] < 1:
+        raise ValueError("row_limit and column_limit must be positive")
+    validate_pivot(options["rows"], options["columns"], measure=options["measure"], facet=options["facet"])
+    return options
+
+
+def compute_view(df, view, filters, options):
+    selection = select_rows(df, **filters)
+    if view == "pivot":
+        columns = sparse_pivot_columns(options["rows"], options["columns"], measure=options["measure"], facet=options["facet"])
+        return {"cells": to_records(sparse_pivot(selection.frame(columns), **options))}
+    return dashboard_aggregates(selection.frame(DASHBOARD_AGGREGATE_COLUMNS))
+
+
+def cache_key(view, filters, options=None):
+    return json.dumps([view, filters, options or {}], sort_keys=True)
+
+
+class AggregateCache:
+    """LRU cache of computed responses keyed by (data version, view, filter, options)."""
+
+    def __init__(self, df, max_entries=256):
+        self.df = df
+        self.version = df.attrs["data_version"]
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, filters, view="aggregates", options=None):
+        digest = hashlib.sha1(f"{API_VERSION}:{self.version}:{cache_key(view, filters, options)}".encode()).hexdigest()
+        return f'"{digest[:20]}"'
+
+    def get(self, filters, view="aggregates", options=None):
+        key = cache_key(view, filters, options)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        payload = compute_view(self.df, view, filters, options)
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+
+class AggregateHandler(BaseHTTPRequestHandler):
+    cache = None  # set by serve()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok", "data_version": self.cache.version})
+        elif url.path in ("/aggregates", "/pivot"):
+            view = url.path.lstrip("/")
+            params = parse_qs(url.query)
+            try:
+                filters = parse_filters(params)
+                options = parse_pivot_options(params) if view == "pivot" else None
+                etag = self.cache.etag(filters, view, options)
+                if etag in self._if_none_match():
+                    self._send_not_modified(etag)
+                    return
+                payload = self.cache.get(filters, view, options)
+            except ValueError as exc:
+                self._send_json(400, {"error": str(exc)})
+                return
+            if view == "pivot":
+                self._send_json(200, {"filters": filters, "pivot": options, "cells": payload["cells"]}, etag=etag)
+            else:
+                self._send_json(200, {"filters": filters, "aggregates": payload}, etag=etag)
+        else:
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/aggregates/batch":
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("request body must be a JSON object")
+            requests = body.get("filters", [])
+            if not isinstance(requests, list):
+                raise ValueError("'filters' must be a list")
+            results = []
+            for item in requests:
+                if not isinstance(item, dict):
+                    raise ValueError("each filter must be an object")
+                known_etag = item.get("etag")
+                filters = parse_filters(item)
+                etag = self.cache.etag(filters)
+                if known_etag == etag:
+                    # The client already holds this answer; skip the body
+                    results.append({"filters": filters, "etag": etag, "not_modified": True})
+                else:
+                    results.append({"filters": filters, "etag": etag, "aggregates": self.cache.get(filters)})
+        except ValueError as exc:  # includes json.JSONDecodeError
+            self._send_json(400, {"error": str(exc)})
+            return
+        self._send_json(200, {"data_version": self.cache.version, "results": results})
+
+    def _if_none_match(self):
+        header = self.headers.get("If-None-Match", "")
+        return {tag.strip() for tag in header.split(",") if tag.strip()}
+
+    def _send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+    def _send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(host="127.0.0.1", port=8502, data_path=DATA_PATH, cache_size=256, sources=SOURCES):
+    AggregateHandler.cache = AggregateCache(load_data(data_path, lang="en", sources=sources), max_entries=cache_size)
+    server = ThreadingHTTPServer((host, port), AggregateHandler)
+    print(f"Serving Superstore aggregates on http://{host}:{port} (data version {AggregateHandler.cache.version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless JSON API for the Superstore dashboard aggregates")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--data", default=DATA_PATH, help="CSV file to serve (default: %(default)s)")
+    parser.add_argument("--sources", default=SOURCES, help="directory or JSON manifest of exports to merge instead of --data")
+    parser.add_argument("--cache-size", type=int, default=256, help="number of filter combinations kept in memory")
+    args = parser.parse_args()
+    serve(host=args.host, port=args.port, data_path=args.data, cache_size=args.cache_size, sources=args.sources)
@@ -1,46 +1,56 @@
+import time
+
+render_started = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+# plotly, statsmodels and the section modules are imported inside the sections that use them
+# (see startup_profile.py), so the landing page does not wait for them on a cold start
+from incremental_aggregates import IncrementalAggregates
+from section_scheduler import chart_slot, render_section
+from superstore_data import (MONTH_ORDER, PIVOT_DIMENSIONS, PIVOT_MEASURES, averaged, kpi_totals, kpis, pivot_grid,
+                             ranked, select_rows, sparse_pivot, sparse_pivot_columns, subcategory_profit_pivot, summed)
+from superstore_data import load_data as load_superstore_data
+from startup_profile import log_render, warm_imports
 
 # ==================== CONFIG ====================
 st.set_page_config(page_title="Superstore Dashboard", layout="wide", initial_sidebar_state="expanded")
+LOADING_TEXT = "⏳ Loading chart..."
 
 # ==================== LOAD DATA ====================
-@st.cache_data
-def map_state_code(state_name):
-    state_dict = {
-        'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
-        'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'District of Columbia': 'DC',
-        'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL',
-        'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA',
-        'Maine': 'ME', 'Maryland': 'MD', 'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN',
-        'Mississippi': 'MS', 'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
-        'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
-        'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
-        'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-        'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT',
-        'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY'
-    }
-    return state_dict.get(state_name, None)
+# One shared, read-only frame for all sessions; st.cache_data would hand every rerun its own copy
+@st.cache_resource
+def load_data():
+    return load_superstore_data(lang="en")
+
+# Bounded: one entry per filter selection and simulator setting, dropped after an hour
+@st.cache_data(max_entries=32, ttl="1h")
+def discount_policy_grid(_filtered_rows, data_version, filters_key, level, elasticity):
+    from discount_simulator import simulate_discount_caps
+    # The selection is identified by data version + filter selection instead of being hashed
+    return simulate_discount_caps(_filtered_rows.frame([level, "Discount", "Sales", "Profit"]), level=level, elasticity=elasticity)
+
+# Bounded: one entry per filter selection and pivot layout, dropped after an hour
+@st.cache_data(max_entries=64, ttl="1h")
+def pivot_cells(_filtered_rows, data_version, filters_key, rows, columns, facet, measure, row_limit, column_limit):
+    source = _filtered_rows.frame(sparse_pivot_columns(rows, columns, measure=measure, facet=facet))
+    return sparse_pivot(source, rows, columns, measure=measure, facet=facet,
+                        row_limit=row_limit, column_limit=column_limit)
+
+@st.cache_resource
+def customer_feature_store():
+    from customer_features import CustomerFeatureStore
+    return CustomerFeatureStore(lang="en")
+
+@st.cache_resource
+def forecast_store():
+    from forecasting import ForecastStore
+    return ForecastStore()
 
 @st.cache_data
-def load_data():
-    df = pd.read_csv("final_data_superstore.csv", encoding='ISO-8859-1', parse_dates=["Order Date", "Ship Date"])
-    df["Profit Margin"] = df["Profit"] / df["Sales"]
-    df["Profit_Per_Quantity"] = df["Profit"] / df["Quantity"]
-    df["Discounted"] = df["Discount"].apply(lambda x: "Yes" if x > 0 else "No")
-    df["Order_Month"] = df["Order Date"].dt.strftime("%B")
-    df["Order_Day"] = df["Order Date"].dt.day # Added for consistency with your column list
-    df["Order_Year"] = df["Order Date"].dt.year
-    df["State Code"] = df["State"].apply(map_state_code)
-
-    # Categorize discount levels for better analysis
-    bins = [-0.01, 0.001, 0.2, 0.5, 1.0] # 0 for no discount, 0-0.2 low, 0.2-0.5 medium, >0.5 high
-    labels = ['No Discount', 'Low Discount', 'Medium Discount', 'High Discount']
-    df['Discount_Level'] = pd.cut(df['Discount'], bins=bins, labels=labels, right=True)
-
-    return df
+def slice_series(_df, data_version, measure, dimension, value):
+    from forecasting import monthly_series
+    return monthly_series(_df, measure, dimension, value)
 
 df = load_data()
 
@@ -67,38 +77,45 @@ selected_years = st.sidebar.multiselect("Order Year", all_years, default=all_yea
 selected_categories = st.sidebar.multiselect("Category", all_categories, default=all_categories)
 selected_segments = st.sidebar.multiselect("Segment", all_segments, default=all_segments)
 
-filtered_df = df[
-    (df["Region"].isin(selected_regions)) &
-    (df["Order_Year"].isin(selected_years)) &
-    (df["Category"].isin(selected_categories)) &
-    (df["Segment"].isin(selected_segments))
-]
+# Lazy view of the selected rows; sections materialize only the columns they use
+filtered_rows = select_rows(df, regions=selected_regions, years=selected_years,
+                            categories=selected_categories, segments=selected_segments)
+# Sorted, so picking the same values in a different order hits the same cache entries
+filters_key = tuple(tuple(sorted(values)) for values in (selected_regions, selected_years, selected_categories, selected_segments))
+
+# Additive section aggregates survive reruns and are updated by the delta of the selection change
+if "section_aggregates" not in st.session_state:
+    st.session_state["section_aggregates"] = IncrementalAggregates()
+aggregates = st.session_state["section_aggregates"].bind(df, {
+    "regions": selected_regions,
+    "years": selected_years,
+    "categories": selected_categories,
+    "segments": selected_segments,
+}, rows=filtered_rows)
 
 # Get previous year data for delta calculation in KPIs
-prev_year_df = pd.DataFrame()
+prev_year_rows = None
 if selected_years and len(selected_years) == 1 and (min(all_years) < selected_years[0]):
     prev_year = selected_years[0] - 1
-    prev_year_df = df[
-        (df["Region"].isin(selected_regions)) &
-        (df["Order_Year"] == prev_year) &
-        (df["Category"].isin(selected_categories)) &
-        (df["Segment"].isin(selected_segments))
-    ]
+    prev_year_rows = select_rows(df, regions=selected_regions, years=[prev_year],
+                                 categories=selected_categories, segments=selected_segments)
 
 # ==================== SECTION: EXECUTIVE OVERVIEW ====================
 if section == "Executive Overview":
     st.title("📊 Executive Overview - Performance Metrics")
 
     # KPI Cards with Delta
-    current_sales = filtered_df['Sales'].sum()
-    current_profit = filtered_df['Profit'].sum()
-    current_profit_margin = current_profit / current_sales if current_sales else 0
-    current_orders = filtered_df['Order ID'].nunique()
-
-    prev_sales = prev_year_df['Sales'].sum() if not prev_year_df.empty else 0
-    prev_profit = prev_year_df['Profit'].sum() if not prev_year_df.empty else 0
-    prev_profit_margin = prev_profit / prev_sales if prev_sales else 0
-    prev_orders = prev_year_df['Order ID'].nunique() if not prev_year_df.empty else 0
+    current = kpi_totals(aggregates.sums("yearly"), filtered_rows.column('Order ID').nunique()) # Distinct counts are not additive
+    current_sales = current["sales"]
+    current_profit = current["profit"]
+    current_profit_margin = current["profit_margin"]
+    current_orders = current["orders"]
+
+    prev = kpis(prev_year_rows.frame(["Sales", "Profit", "Order ID"])) if prev_year_rows is not None and not prev_year_rows.empty else {"sales": 0, "profit": 0, "profit_margin": 0, "orders": 0}
+    prev_sales = prev["sales"]
+    prev_profit = prev["profit"]
+    prev_profit_margin = prev["profit_margin"]
+    prev_orders = prev["orders"]
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -112,104 +129,137 @@ if section == "Executive Overview":
 
     st.markdown("---")
 
+    # Imported only after the KPI cards are on screen
+    import plotly.express as px
+
     col_exec1, col_exec2 = st.columns(2)
     with col_exec1:
         with st.expander("📈 Yearly Sales & Profit Trends", expanded=True):
-            yearly_summary = filtered_df.groupby("Order_Year")[["Sales", "Profit"]].sum().reset_index()
-            fig_year = px.bar(yearly_summary, x="Order_Year", y=["Sales", "Profit"],
-                              barmode="group",
-                              title="Sales and Profit by Year",
-                              labels={"Order_Year": "Year", "value": "Amount ($)"},
-                              color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'}, # Google colors
-                              template="plotly_white",
-                              hover_data={"Order_Year": True, "value": ":,.0f"})
-            fig_year.update_layout(height=400)
-            st.plotly_chart(fig_year, use_container_width=True)
+            slot_year = chart_slot(LOADING_TEXT)
 
     with col_exec2:
         with st.expander("📍 Profit by Region", expanded=True):
-            region_summary = filtered_df.groupby("Region")["Profit"].sum().reset_index()
-            fig_region = px.bar(region_summary, x="Region", y="Profit",
-                                 color="Profit", color_continuous_scale="RdYlGn",
-                                 title="Profit Distribution by Region",
-                                 labels={"Profit": "Total Profit ($)"},
-                                 template="plotly_white",
-                                 hover_data={"Profit": ":,.0f"})
-            fig_region.update_layout(height=400)
-            st.plotly_chart(fig_region, use_container_width=True)
+            slot_region = chart_slot(LOADING_TEXT)
     
     st.markdown("---")
 
     col_exec3, col_exec4 = st.columns(2)
     with col_exec3:
         with st.expander("🗓️ Monthly Sales & Profit Trends", expanded=True):
-            monthly_summary = filtered_df.groupby("Order_Month")[["Sales", "Profit"]].sum().reindex(
-                ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-            ).reset_index()
-            fig_month = px.line(monthly_summary, x="Order_Month", y=["Sales", "Profit"],
-                                markers=True,
-                                title="Monthly Sales and Profit Trends",
-                                labels={"Order_Month": "Month", "value": "Amount ($)"},
-                                color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
-                                template="plotly_white",
-                                hover_data={"Order_Month": True, "value": ":,.0f"})
-            fig_month.update_layout(height=400)
-            st.plotly_chart(fig_month, use_container_width=True)
+            slot_month = chart_slot(LOADING_TEXT)
     
     with col_exec4:
         with st.expander("👥 Sales & Profit by Customer Segment", expanded=True):
-            segment_summary = filtered_df.groupby("Segment")[["Sales", "Profit"]].sum().reset_index()
-            fig_segment = px.bar(segment_summary, x="Segment", y=["Sales", "Profit"],
-                                 barmode="group",
-                                 title="Sales and Profit by Customer Segment",
-                                 labels={"value": "Amount ($)"},
-                                 color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
-                                 template="plotly_white",
-                                 hover_data={"value": ":,.0f"})
-            fig_segment.update_layout(height=400)
-            st.plotly_chart(fig_segment, use_container_width=True)
+            slot_segment = chart_slot(LOADING_TEXT)
+
+    def build_yearly_chart():
+        yearly_summary = summed(aggregates.sums("yearly"), ["Sales", "Profit"])
+        fig_year = px.bar(yearly_summary, x="Order_Year", y=["Sales", "Profit"],
+                          barmode="group",
+                          title="Sales and Profit by Year",
+                          labels={"Order_Year": "Year", "value": "Amount ($)"},
+                          color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'}, # Google colors
+                          template="plotly_white",
+                          hover_data={"Order_Year": True, "value": ":,.0f"})
+        fig_year.update_layout(height=400)
+        return fig_year
+
+    def build_region_chart():
+        region_summary = summed(aggregates.sums("region"), ["Profit"])
+        fig_region = px.bar(region_summary, x="Region", y="Profit",
+                             color="Profit", color_continuous_scale="RdYlGn",
+                             title="Profit Distribution by Region",
+                             labels={"Profit": "Total Profit ($)"},
+                             template="plotly_white",
+                             hover_data={"Profit": ":,.0f"})
+        fig_region.update_layout(height=400)
+        return fig_region
+
+    def build_month_chart():
+        month_summary = summed(aggregates.sums("monthly"), ["Sales", "Profit"], order=MONTH_ORDER)
+        fig_month = px.line(month_summary, x="Order_Month", y=["Sales", "Profit"],
+                            markers=True,
+                            title="Monthly Sales and Profit Trends",
+                            labels={"Order_Month": "Month", "value": "Amount ($)"},
+                            color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
+                            template="plotly_white",
+                            hover_data={"Order_Month": True, "value": ":,.0f"})
+        fig_month.update_layout(height=400)
+        return fig_month
+
+    def build_segment_chart():
+        segment_summary = summed(aggregates.sums("segment"), ["Sales", "Profit"])
+        fig_segment = px.bar(segment_summary, x="Segment", y=["Sales", "Profit"],
+                             barmode="group",
+                             title="Sales and Profit by Customer Segment",
+                             labels={"value": "Amount ($)"},
+                             color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
+                             template="plotly_white",
+                             hover_data={"value": ":,.0f"})
+        fig_segment.update_layout(height=400)
+        return fig_segment
+
+    render_section([
+        (slot_year, build_yearly_chart),
+        (slot_region, build_region_chart),
+        (slot_month, build_month_chart),
+        (slot_segment, build_segment_chart),
+    ])
 
 # ==================== SECTION: CATEGORY & PRODUCT ====================
 elif section == "Category & Product":
     st.title("📦 Category & Product Analysis")
+    import plotly.express as px
 
     with st.expander("Hierarchical Sales & Profit by Category and Sub-Category", expanded=True):
-        category_summary = filtered_df.groupby(["Category", "Sub-Category"])[["Sales", "Profit"]].sum().reset_index()
-        fig_cat_treemap = px.treemap(category_summary, path=["Category", "Sub-Category"], values="Sales",
-                                     color="Profit", color_continuous_scale="RdYlGn",
-                                     title="Sales & Profit by Category and Sub-Category (Treemap)",
-                                     template="plotly_white",
-                                     hover_data={"Sales": ":,.0f", "Profit": ":,.0f"})
-        fig_cat_treemap.update_layout(height=600)
-        st.plotly_chart(fig_cat_treemap, use_container_width=True)
+        slot_treemap = chart_slot(LOADING_TEXT)
 
     col_prod1, col_prod2 = st.columns(2)
     with col_prod1:
         with st.expander("🔝 Top 10 Most Profitable Products", expanded=True):
-            top_products = filtered_df.groupby("Product Name")["Profit"].sum().sort_values(ascending=False).head(10).reset_index()
-            fig_top_prod = px.bar(top_products, x="Profit", y="Product Name", orientation="h",
-                                  title="Top 10 Most Profitable Products",
-                                  labels={"Profit": "Total Profit ($)", "Product Name": "Product"},
-                                  color="Profit", color_continuous_scale="Greens",
-                                  template="plotly_white",
-                                  hover_data={"Profit": ":,.0f"})
-            fig_top_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
-            st.plotly_chart(fig_top_prod, use_container_width=True)
+            slot_top_prod = chart_slot(LOADING_TEXT)
 
     with col_prod2:
         with st.expander("⬇️ Top 10 Most Loss-Making Products", expanded=True):
-            worst_products = filtered_df.groupby("Product Name")["Profit"].sum().sort_values(ascending=True).head(10).reset_index()
-            fig_worst_prod = px.bar(worst_products, x="Profit", y="Product Name", orientation="h",
-                                    title="Top 10 Most Loss-Making Products",
-                                    labels={"Profit": "Total Profit ($)", "Product Name": "Product"},
-                                    color="Profit", color_continuous_scale="Reds_r", # Reversed reds for losses
-                                    template="plotly_white",
-                                    hover_data={"Profit": ":,.0f"})
-            fig_worst_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
-            st.plotly_chart(fig_worst_prod, use_container_width=True)
+            slot_worst_prod = chart_slot(LOADING_TEXT)
     
     with st.expander("🔥 Profitability Heatmap by Sub-Category", expanded=True):
-        sub_category_pivot = filtered_df.pivot_table(index="Sub-Category", columns="Category", values="Profit", aggfunc="sum").fillna(0)
+        slot_heatmap = chart_slot(LOADING_TEXT)
+
+    def build_treemap_chart():
+        cat_summary = summed(aggregates.sums("category"), ["Sales", "Profit"])
+        fig_cat_treemap = px.treemap(cat_summary, path=["Category", "Sub-Category"], values="Sales",
+                                     color="Profit", color_continuous_scale="RdYlGn",
+                                     title="Sales & Profit by Category and Sub-Category (Treemap)",
+                                     template="plotly_white",
+                                     hover_data={"Sales": ":,.0f", "Profit": ":,.0f"})
+        fig_cat_treemap.update_layout(height=600)
+        return fig_cat_treemap
+
+    def build_top_products_chart():
+        top_products = ranked(aggregates.sums("product"), "Profit", n=10)
+        fig_top_prod = px.bar(top_products, x="Profit", y="Product Name", orientation="h",
+                              title="Top 10 Most Profitable Products",
+                              labels={"Profit": "Total Profit ($)", "Product Name": "Product"},
+                              color="Profit", color_continuous_scale="Greens",
+                              template="plotly_white",
+                              hover_data={"Profit": ":,.0f"})
+        fig_top_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
+        return fig_top_prod
+
+    def build_worst_products_chart():
+        worst_products = ranked(aggregates.sums("product"), "Profit", n=10, ascending=True)
+        fig_worst_prod = px.bar(worst_products, x="Profit", y="Product Name", orientation="h",
+                                title="Top 10 Most Loss-Making Products",
+                                labels={"Profit": "Total Profit ($)", "Product Name": "Product"},
+                                color="Profit", color_continuous_scale="Reds_r", # Reversed reds for losses
+                                template="plotly_white",
+                                hover_data={"Profit": ":,.0f"})
+        fig_worst_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
+        return fig_worst_prod
+
+    def build_heatmap_chart():
+        sub_category_pivot = subcategory_profit_pivot(filtered_rows.frame(["Sub-Category", "Category", "Profit"]))
         fig_heatmap = px.imshow(sub_category_pivot,
                                  labels=dict(x="Category", y="Sub-Category", color="Profit"),
                                  x=sub_category_pivot.columns,
@@ -219,37 +269,113 @@ elif section == "Category & Product":
                                  text_auto=".2s", # Show values on heatmap
                                  aspect="auto")
         fig_heatmap.update_layout(height=600)
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        return fig_heatmap
+
+    render_section([
+        (slot_treemap, build_treemap_chart),
+        (slot_top_prod, build_top_products_chart),
+        (slot_worst_prod, build_worst_products_chart),
+        (slot_heatmap, build_heatmap_chart),
+    ])
+
+    with st.expander("🧮 Pivot Explorer", expanded=True):
+        no_slice = "(none)"
+        col_piv1, col_piv2, col_piv3, col_piv4 = st.columns(4)
+        pivot_rows = col_piv1.selectbox("Rows", PIVOT_DIMENSIONS, index=PIVOT_DIMENSIONS.index("State"))
+        column_options = [dim for dim in PIVOT_DIMENSIONS if dim != pivot_rows]
+        pivot_columns = col_piv2.selectbox("Columns", column_options,
+                                           index=column_options.index("Sub-Category") if "Sub-Category" in column_options else 0)
+        pivot_facet = col_piv3.selectbox("Slice By", [no_slice] + [dim for dim in column_options if dim != pivot_columns])
+        pivot_measure = col_piv4.selectbox("Measure", PIVOT_MEASURES, index=PIVOT_MEASURES.index("Profit"))
+        col_piv5, col_piv6 = st.columns(2)
+        pivot_row_limit = col_piv5.slider("Max Rows", 5, 50, 20, help="Remaining values are grouped into \"Other\"")
+        pivot_column_limit = col_piv6.slider("Max Columns", 3, 30, 12, help="Remaining values are grouped into \"Other\"")
+
+        pivot_facet = None if pivot_facet == no_slice else pivot_facet
+        cells = pivot_cells(filtered_rows, df.attrs["data_version"], filters_key, pivot_rows, pivot_columns,
+                            pivot_facet, pivot_measure, pivot_row_limit, pivot_column_limit)
+        if pivot_facet:
+            facet_value = st.selectbox(pivot_facet, list(cells[pivot_facet].cat.categories))
+            cells = cells[cells[pivot_facet] == facet_value]
+
+        if cells.empty:
+            st.info("No data for the current filters.")
+        else:
+            pivot_table = pivot_grid(cells, pivot_rows, pivot_columns, pivot_measure)
+            fig_pivot = px.imshow(pivot_table,
+                                  labels=dict(x=pivot_columns, y=pivot_rows, color=pivot_measure),
+                                  x=[str(value) for value in pivot_table.columns],
+                                  y=[str(value) for value in pivot_table.index],
+                                  color_continuous_scale="RdYlGn",
+                                  title=f"{pivot_measure} by {pivot_rows} and {pivot_columns}",
+                                  text_auto=".0%" if pivot_measure == "Profit Margin" else ".2s",
+                                  aspect="auto")
+            fig_pivot.update_layout(height=max(400, 28 * len(pivot_table.index)))
+            st.plotly_chart(fig_pivot, use_container_width=True)
+            st.caption(f"{len(cells)} non-empty cells")
 
 
 # ==================== SECTION: CUSTOMER SEGMENTATION ====================
 elif section == "Customer Segmentation":
     st.title("👥 Customer Segmentation Analysis")
+    import plotly.express as px
+
+    # Lifetime customer features, materialized once and extended as new orders arrive.
+    # Segment is a customer attribute, so that filter applies to the table directly.
+    customer_features = customer_feature_store().refresh(df)
+    segment_features = customer_features[customer_features["Segment"].isin(selected_segments)]
+    unfiltered_orders = (len(selected_regions) == len(all_regions) and len(selected_years) == len(all_years)
+                         and len(selected_categories) == len(all_categories))
 
     col_cust1, col_cust2 = st.columns(2)
     with col_cust1:
         with st.expander("📊 Average Profit per Segment", expanded=True):
-            avg_profit_seg = filtered_df.groupby("Segment")["Profit"].mean().reset_index()
-            fig_avg_profit_seg = px.pie(avg_profit_seg, names="Segment", values="Profit",
-                                        title="Average Profit per Customer Segment",
-                                        template="plotly_white",
-                                        hover_data={"Profit": ":,.2f"})
-            fig_avg_profit_seg.update_traces(textinfo='percent+label', pull=[0.05 if s == avg_profit_seg['Segment'].max() else 0 for s in avg_profit_seg['Segment']])
-            st.plotly_chart(fig_avg_profit_seg, use_container_width=True)
+            slot_avg_profit_seg = chart_slot(LOADING_TEXT)
 
     with col_cust2:
         with st.expander("📈 Total Sales per Segment", expanded=True):
-            total_sales_seg = filtered_df.groupby("Segment")["Sales"].sum().reset_index()
-            fig_total_sales_seg = px.bar(total_sales_seg, x="Segment", y="Sales",
-                                         title="Total Sales by Customer Segment",
-                                         labels={"Sales": "Total Sales ($)"},
-                                         color="Sales", color_continuous_scale="Blues",
-                                         template="plotly_white",
-                                         hover_data={"Sales": ":,.0f"})
-            st.plotly_chart(fig_total_sales_seg, use_container_width=True)
+            slot_total_sales_seg = chart_slot(LOADING_TEXT)
 
     with st.expander("💰 Top 10 Most Profitable Customers", expanded=True):
-        top_customers = filtered_df.groupby("Customer Name")["Profit"].sum().sort_values(ascending=False).head(10).reset_index()
+        slot_top_cust = chart_slot(LOADING_TEXT)
+
+    col_cust3, col_cust4 = st.columns(2)
+    with col_cust3:
+        with st.expander("🧭 Customers per RFM Segment", expanded=True):
+            slot_rfm_seg = chart_slot(LOADING_TEXT)
+
+    with col_cust4:
+        with st.expander("🏅 Customer Ranking (RFM)", expanded=True):
+            st.caption("Lifetime recency, frequency and monetary value per customer; follows the Segment filter only.")
+            rfm_ranking = segment_features.sort_values(["Monetary", "Profit"], ascending=False).head(20)
+            st.dataframe(rfm_ranking[["Customer Name", "Segment", "RFM Segment", "Recency", "Frequency", "Monetary",
+                                      "Profit", "Avg Discount", "First Order", "Last Order"]],
+                         use_container_width=True)
+
+    def build_avg_profit_segment_chart():
+        avg_profit_seg = averaged(aggregates.sums("segment"), ["Profit"])
+        fig_avg_profit_seg = px.pie(avg_profit_seg, names="Segment", values="Profit",
+                                    title="Average Profit per Customer Segment",
+                                    template="plotly_white",
+                                    hover_data={"Profit": ":,.2f"})
+        fig_avg_profit_seg.update_traces(textinfo='percent+label', pull=[0.05 if s == avg_profit_seg['Segment'].max() else 0 for s in avg_profit_seg['Segment']])
+        return fig_avg_profit_seg
+
+    def build_total_sales_segment_chart():
+        total_sales_seg = summed(aggregates.sums("segment"), ["Sales"])
+        fig_total_sales_seg = px.bar(total_sales_seg, x="Segment", y="Sales",
+                                     title="Total Sales by Customer Segment",
+                                     labels={"Sales": "Total Sales ($)"},
+                                     color="Sales", color_continuous_scale="Blues",
+                                     template="plotly_white",
+                                     hover_data={"Sales": ":,.0f"})
+        return fig_total_sales_seg
+
+    def build_top_customers_chart():
+        if unfiltered_orders:
+            top_customers = segment_features.nlargest(10, "Profit")[["Customer Name", "Profit"]]
+        else:
+            top_customers = ranked(aggregates.sums("customer"), "Profit", n=10)
         fig_top_cust = px.bar(top_customers, x="Profit", y="Customer Name", orientation="h",
                               title="Top 10 Most Profitable Customers",
                               labels={"Profit": "Total Profit ($)", "Customer Name": "Customer"},
@@ -257,90 +383,211 @@ elif section == "Customer Segmentation":
                               template="plotly_white",
                               hover_data={"Profit": ":,.0f"})
         fig_top_cust.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_top_cust, use_container_width=True)
+        return fig_top_cust
+
+    def build_rfm_segment_chart():
+        rfm_summary = segment_features.groupby("RFM Segment").agg(Customers=("Monetary", "size"), Monetary=("Monetary", "sum")).reset_index()
+        fig_rfm_seg = px.bar(rfm_summary, x="RFM Segment", y="Customers",
+                             title="Customers per RFM Segment",
+                             labels={"Monetary": "Total Sales ($)"},
+                             color="Monetary", color_continuous_scale="Blues",
+                             template="plotly_white",
+                             hover_data={"Monetary": ":,.0f"})
+        fig_rfm_seg.update_layout(xaxis={'categoryorder':'total descending'})
+        return fig_rfm_seg
+
+    render_section([
+        (slot_avg_profit_seg, build_avg_profit_segment_chart),
+        (slot_total_sales_seg, build_total_sales_segment_chart),
+        (slot_top_cust, build_top_customers_chart),
+        (slot_rfm_seg, build_rfm_segment_chart),
+    ])
 
 # ==================== SECTION: DISCOUNT ANALYSIS ====================
 elif section == "Discount Analysis":
     st.title("💸 Discount vs. Performance Analysis")
+    import plotly.express as px
 
     col_disc1, col_disc2 = st.columns(2)
     with col_disc1:
         with st.expander("📉 Profit Margin vs. Discount by Category", expanded=True):
-            fig_scatter_profit_margin = px.scatter(filtered_df, x="Discount", y="Profit Margin", color="Category",
-                                                   hover_name="Product Name",
-                                                   title="Profit Margin vs. Discount by Product Category",
-                                                   labels={"Discount": "Discount Rate", "Profit Margin": "Profit Margin"},
-                                                   trendline="ols", # Add a trendline
-                                                   template="plotly_white",
-                                                   hover_data={"Sales": ":,.0f", "Profit": ":,.0f", "Discount": ":.2%"})
-            st.plotly_chart(fig_scatter_profit_margin, use_container_width=True)
+            slot_scatter = chart_slot(LOADING_TEXT)
 
     with col_disc2:
         with st.expander("📊 Discount Distribution", expanded=True):
-            fig_hist_discount = px.histogram(filtered_df, x="Discount", nbins=20,
-                                             title="Distribution of Discount Rates",
-                                             labels={"Discount": "Discount Rate"},
-                                             template="plotly_white")
-            st.plotly_chart(fig_hist_discount, use_container_width=True)
+            slot_hist = chart_slot(LOADING_TEXT)
     
     with st.expander("📈 Average Sales & Profit by Discount Level", expanded=True):
-        discount_level_summary = filtered_df.groupby('Discount_Level')[['Sales', 'Profit']].mean().reset_index()
-        fig_avg_disc_level = px.bar(discount_level_summary, x='Discount_Level', y=['Sales', 'Profit'],
+        slot_disc_level = chart_slot(LOADING_TEXT)
+
+    def build_scatter_chart():
+        scatter_source = filtered_rows.frame(["Discount", "Profit Margin", "Category", "Product Name", "Sales", "Profit"])
+        fig_scatter_profit_margin = px.scatter(scatter_source, x="Discount", y="Profit Margin", color="Category",
+                                               hover_name="Product Name",
+                                               title="Profit Margin vs. Discount by Product Category",
+                                               labels={"Discount": "Discount Rate", "Profit Margin": "Profit Margin"},
+                                               trendline="ols", # Add a trendline
+                                               template="plotly_white",
+                                               hover_data={"Sales": ":,.0f", "Profit": ":,.0f", "Discount": ":.2%"})
+        return fig_scatter_profit_margin
+
+    def build_hist_chart():
+        fig_hist_discount = px.histogram(filtered_rows.frame(["Discount"]), x="Discount", nbins=20,
+                                         title="Distribution of Discount Rates",
+                                         labels={"Discount": "Discount Rate"},
+                                         template="plotly_white")
+        return fig_hist_discount
+
+    def build_discount_level_chart():
+        disc_level_summary = averaged(aggregates.sums("discount_level"), ['Sales', 'Profit'], order=df['Discount_Level'].cat.categories)
+        fig_avg_disc_level = px.bar(disc_level_summary, x='Discount_Level', y=['Sales', 'Profit'],
                                     barmode='group',
                                     title="Average Sales & Profit by Discount Level",
                                     labels={"value": "Average Amount ($)", "Discount_Level": "Discount Level"},
                                     color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
                                     template="plotly_white",
                                     hover_data={"value": ":,.0f"})
-        st.plotly_chart(fig_avg_disc_level, use_container_width=True)
+        return fig_avg_disc_level
+
+    render_section([
+        (slot_scatter, build_scatter_chart),
+        (slot_hist, build_hist_chart),
+        (slot_disc_level, build_discount_level_chart),
+    ])
+
+    with st.expander("🧪 Discount Cap What-If", expanded=True):
+        st.caption("Caps the maximum discount of one group. List prices and unit costs stay fixed; volume reacts to the lower discount by the chosen elasticity.")
+        col_sim1, col_sim2, col_sim3 = st.columns(3)
+        sim_level = col_sim1.radio("Policy Level", ["Category", "Sub-Category"], horizontal=True)
+        sim_elasticity = col_sim3.slider("Volume Elasticity", 0.0, 5.0, 0.0, 0.5,
+                                         help="2.0 means cutting the discount by 10 points loses 20% of the volume")
+        policy_grid = discount_policy_grid(filtered_rows, df.attrs["data_version"], filters_key, sim_level, sim_elasticity)
+
+        if policy_grid.empty:
+            st.info("No data for the current filters.")
+        else:
+            sim_group = col_sim1.selectbox("Group", sorted(policy_grid[sim_level].unique()))
+            scenario_curve = policy_grid[policy_grid[sim_level] == sim_group]
+            cap_options = scenario_curve["Max Discount"].tolist()
+            sim_cap = col_sim2.select_slider("Maximum Discount", options=cap_options, value=cap_options[-1],
+                                             format_func=lambda cap: f"{cap:.0%}")
+            scenario = scenario_curve[scenario_curve["Max Discount"] == sim_cap].iloc[0]
+
+            col_sim4, col_sim5 = st.columns(2)
+            col_sim4.metric("Projected Total Sales", f"${scenario['Total Sales']:,.0f}", delta=f"{scenario['Sales Change']:,.0f}")
+            col_sim5.metric("Projected Total Profit", f"${scenario['Total Profit']:,.0f}", delta=f"{scenario['Profit Change']:,.0f}")
+
+            fig_what_if = px.line(scenario_curve, x="Max Discount", y=["Sales", "Profit"],
+                                  markers=True,
+                                  title=f"Projected Sales & Profit of {sim_group} by Discount Cap",
+                                  labels={"Max Discount": "Maximum Discount", "value": "Amount ($)"},
+                                  color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
+                                  template="plotly_white",
+                                  hover_data={"value": ":,.0f"})
+            fig_what_if.add_vline(x=sim_cap, line_dash="dash", line_color="#777")
+            fig_what_if.update_layout(xaxis_tickformat=".0%")
+            st.plotly_chart(fig_what_if, use_container_width=True)
 
 
 # ==================== SECTION: TIME SERIES ====================
 elif section == "Time Series":
     st.title("📈 Time Series Analysis")
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    from forecasting import FORECAST_DIMENSIONS, FORECAST_MEASURES
 
     time_series_metric = st.selectbox("Select Metric for Time Series:", ["Sales", "Profit", "Profit Margin"])
 
+    # Adjust y-axis label based on selected metric
+    y_label = "Amount ($)"
+    if time_series_metric == "Profit Margin":
+        y_label = "Profit Margin (%)"
+
     with st.expander(f"🗓️ Monthly {time_series_metric} Trends", expanded=True):
-        monthly_trends = filtered_df.groupby("Order_Month")[[time_series_metric]].sum().reindex(
-            ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-        ).reset_index()
-        
-        # Adjust y-axis label based on selected metric
-        y_label = "Amount ($)"
-        if time_series_metric == "Profit Margin":
-            y_label = "Profit Margin (%)"
+        slot_monthly_trend = chart_slot(LOADING_TEXT)
+    
+    with st.expander(f"📊 Yearly {time_series_metric} Trends", expanded=True):
+        slot_yearly_trend = chart_slot(LOADING_TEXT)
 
+    def build_monthly_trend_chart():
+        monthly_trends = summed(aggregates.sums("monthly"), [time_series_metric], order=MONTH_ORDER)
         fig_monthly_trend = px.line(monthly_trends, x="Order_Month", y=time_series_metric,
                                     markers=True,
                                     title=f"Monthly {time_series_metric} Trends",
                                     labels={"Order_Month": "Month", time_series_metric: y_label},
                                     template="plotly_white",
                                     hover_data={time_series_metric: ":,.2f" if time_series_metric == "Profit Margin" else ":,.0f"})
-        st.plotly_chart(fig_monthly_trend, use_container_width=True)
-    
-    with st.expander(f"📊 Yearly {time_series_metric} Trends", expanded=True):
-        yearly_trends = filtered_df.groupby("Order_Year")[[time_series_metric]].sum().reset_index()
-        
-        # Adjust y-axis label based on selected metric
-        y_label = "Amount ($)"
-        if time_series_metric == "Profit Margin":
-            y_label = "Profit Margin (%)"
+        return fig_monthly_trend
 
+    def build_yearly_trend_chart():
+        yearly_trends = summed(aggregates.sums("yearly"), [time_series_metric])
         fig_yearly_trend = px.line(yearly_trends, x="Order_Year", y=time_series_metric,
                                     markers=True,
                                     title=f"Yearly {time_series_metric} Trends",
                                     labels={"Order_Year": "Year", time_series_metric: y_label},
                                     template="plotly_white",
                                     hover_data={time_series_metric: ":,.2f" if time_series_metric == "Profit Margin" else ":,.0f"})
-        st.plotly_chart(fig_yearly_trend, use_container_width=True)
+        return fig_yearly_trend
+
+    render_section([
+        (slot_monthly_trend, build_monthly_trend_chart),
+        (slot_yearly_trend, build_yearly_trend_chart),
+    ])
+
+    with st.expander("🔮 Monthly Forecast", expanded=True):
+        col_fc1, col_fc2, col_fc3 = st.columns(3)
+        forecast_measure = col_fc1.selectbox("Forecast Metric", FORECAST_MEASURES,
+                                             index=FORECAST_MEASURES.index(time_series_metric) if time_series_metric in FORECAST_MEASURES else 0)
+        forecast_slice = col_fc2.selectbox("Forecast Slice", ["All"] + FORECAST_DIMENSIONS)
+        forecast_dimension = None if forecast_slice == "All" else forecast_slice
+        slice_values = [None] if forecast_dimension is None else sorted(df[forecast_dimension].unique())
+        forecast_value = None if forecast_dimension is None else col_fc3.selectbox(forecast_dimension, slice_values)
+
+        # Models are fitted in a background process pool, never in this rerun; every slice of the
+        # chosen dimension is queued at once so they warm up in parallel
+        data_version = df.attrs["data_version"]
+        store = forecast_store()
+        store.warm_up(((forecast_measure, forecast_slice, value),
+                       slice_series(df, data_version, forecast_measure, forecast_dimension, value),
+                       data_version)
+                      for value in slice_values)
+        forecast_key = (forecast_measure, forecast_slice, forecast_value)
+        history = slice_series(df, data_version, forecast_measure, forecast_dimension, forecast_value)
+        forecast, forecast_is_current = store.request(forecast_key, history, data_version)
+
+        if forecast is None:
+            if store.error(forecast_key) is not None:
+                st.warning(f"The forecast for this slice could not be fitted: {store.error(forecast_key)}")
+            else:
+                st.info("⏳ The forecast model for this slice is being fitted in the background.")
+                st.button("Refresh Forecast")
+        else:
+            if not forecast_is_current:
+                st.caption("Showing the previous fit while the model is updated with new months.")
+            fig_forecast = go.Figure()
+            fig_forecast.add_trace(go.Scatter(x=forecast.index, y=forecast["Upper"], mode="lines",
+                                              line=dict(width=0), showlegend=False, hoverinfo="skip"))
+            fig_forecast.add_trace(go.Scatter(x=forecast.index, y=forecast["Lower"], mode="lines",
+                                              line=dict(width=0), fill="tonexty", fillcolor="rgba(52, 168, 83, 0.2)",
+                                              name="80% Interval"))
+            fig_forecast.add_trace(go.Scatter(x=history.index, y=history.values, mode="lines+markers",
+                                              name="Actual", line=dict(color="#4285F4")))
+            fig_forecast.add_trace(go.Scatter(x=forecast.index, y=forecast["Forecast"], mode="lines",
+                                              name="Forecast", line=dict(color="#34A853", dash="dash")))
+            fig_forecast.update_layout(title=f"Monthly {forecast_measure} Forecast ({forecast_value or 'All'})",
+                                       xaxis_title="Month", yaxis_title="Amount ($)",
+                                       template="plotly_white", hovermode="x unified")
+            st.plotly_chart(fig_forecast, use_container_width=True)
+        st.caption("Forecasts use the full history of the slice; the sidebar filters do not apply.")
 
 # ==================== SECTION: GEO PROFIT MAP ====================
 elif section == "Geo Profit Map":
     st.title("🗺️ Profit Distribution by State (Map)")
+    import plotly.express as px
 
     with st.expander("📍 Profit by State on U.S. Map", expanded=True):
-        state_summary = filtered_df.groupby(["State", "State Code"])["Profit"].sum().reset_index()
+        state_summary = summed(aggregates.sums("state"), ["Profit"])
         fig_map = px.choropleth(
             state_summary,
             locations="State Code",
@@ -373,4 +620,8 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# Logged per process; heavy modules are loaded in the background once the first page is out
+log_render(section, render_started)
+warm_imports()
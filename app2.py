@@ -1,46 +1,56 @@
+import time
+
+render_started = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+# plotly, statsmodels, dan modul per halaman di-import di dalam halaman yang memakainya
+# (lihat startup_profile.py), sehingga halaman awal tidak menunggunya saat cold start
+from incremental_aggregates import IncrementalAggregates
+from section_scheduler import chart_slot, render_section
+from superstore_data import (MONTH_ORDER, PIVOT_DIMENSIONS, PIVOT_MEASURES, averaged, kpi_totals, kpis, pivot_grid,
+                             ranked, select_rows, sparse_pivot, sparse_pivot_columns, subcategory_profit_pivot, summed)
+from superstore_data import load_data as load_superstore_data
+from startup_profile import log_render, warm_imports
 
 # ==================== KONFIGURASI ====================
 st.set_page_config(page_title="Dasbor Superstore", layout="wide", initial_sidebar_state="expanded")
+LOADING_TEXT = "⏳ Memuat grafik..."
 
 # ==================== MUAT DATA ====================
-@st.cache_data
-def map_state_code(state_name):
-    state_dict = {
-        'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
-        'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'District of Columbia': 'DC',
-        'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL',
-        'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA',
-        'Maine': 'ME', 'Maryland': 'MD', 'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN',
-        'Mississippi': 'MS', 'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
-        'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
-        'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
-        'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-        'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT',
-        'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY'
-    }
-    return state_dict.get(state_name, None)
+# Satu frame bersama yang hanya-baca untuk semua sesi; st.cache_data akan memberi setiap rerun salinannya sendiri
+@st.cache_resource
+def load_data():
+    return load_superstore_data(lang="id")
+
+# Dibatasi: satu entri per pilihan filter dan pengaturan simulator, dibuang setelah satu jam
+@st.cache_data(max_entries=32, ttl="1h")
+def discount_policy_grid(_filtered_rows, data_version, filters_key, level, elasticity):
+    from discount_simulator import simulate_discount_caps
+    # Seleksi dikenali dari versi data + pilihan filter alih-alih di-hash
+    return simulate_discount_caps(_filtered_rows.frame([level, "Discount", "Sales", "Profit"]), level=level, elasticity=elasticity)
+
+# Dibatasi: satu entri per pilihan filter dan tata letak pivot, dibuang setelah satu jam
+@st.cache_data(max_entries=64, ttl="1h")
+def pivot_cells(_filtered_rows, data_version, filters_key, rows, columns, facet, measure, row_limit, column_limit):
+    source = _filtered_rows.frame(sparse_pivot_columns(rows, columns, measure=measure, facet=facet))
+    return sparse_pivot(source, rows, columns, measure=measure, facet=facet,
+                        row_limit=row_limit, column_limit=column_limit)
+
+@st.cache_resource
+def customer_feature_store():
+    from customer_features import CustomerFeatureStore
+    return CustomerFeatureStore(lang="id")
+
+@st.cache_resource
+def forecast_store():
+    from forecasting import ForecastStore
+    return ForecastStore()
 
 @st.cache_data
-def load_data():
-    df = pd.read_csv("final_data_superstore.csv", encoding='ISO-8859-1', parse_dates=["Order Date", "Ship Date"])
-    df["Profit Margin"] = df["Profit"] / df["Sales"]
-    df["Profit_Per_Quantity"] = df["Profit"] / df["Quantity"]
-    df["Discounted"] = df["Discount"].apply(lambda x: "Ya" if x > 0 else "Tidak")
-    df["Order_Month"] = df["Order Date"].dt.strftime("%B")
-    df["Order_Day"] = df["Order Date"].dt.day
-    df["Order_Year"] = df["Order Date"].dt.year
-    df["State Code"] = df["State"].apply(map_state_code)
-
-    # Kategorikan tingkat diskon untuk analisis yang lebih baik
-    bins = [-0.01, 0.001, 0.2, 0.5, 1.0] # 0 untuk tanpa diskon, 0-0.2 rendah, 0.2-0.5 sedang, >0.5 tinggi
-    labels = ['Tanpa Diskon', 'Diskon Rendah', 'Diskon Sedang', 'Diskon Tinggi']
-    df['Discount_Level'] = pd.cut(df['Discount'], bins=bins, labels=labels, right=True)
-
-    return df
+def slice_series(_df, data_version, measure, dimension, value):
+    from forecasting import monthly_series
+    return monthly_series(_df, measure, dimension, value)
 
 df = load_data()
 
@@ -67,38 +77,45 @@ selected_years = st.sidebar.multiselect("Tahun Pesanan", all_years, default=all_
 selected_categories = st.sidebar.multiselect("Kategori", all_categories, default=all_categories)
 selected_segments = st.sidebar.multiselect("Segmen", all_segments, default=all_segments)
 
-filtered_df = df[
-    (df["Region"].isin(selected_regions)) &
-    (df["Order_Year"].isin(selected_years)) &
-    (df["Category"].isin(selected_categories)) &
-    (df["Segment"].isin(selected_segments))
-]
+# Tampilan malas (lazy) atas baris terpilih; setiap bagian hanya mengambil kolom yang dipakainya
+filtered_rows = select_rows(df, regions=selected_regions, years=selected_years,
+                            categories=selected_categories, segments=selected_segments)
+# Diurutkan, agar memilih nilai yang sama dengan urutan berbeda memakai entri cache yang sama
+filters_key = tuple(tuple(sorted(values)) for values in (selected_regions, selected_years, selected_categories, selected_segments))
+
+# Agregat bagian yang aditif bertahan antar-rerun dan diperbarui sebesar delta perubahan pilihan
+if "section_aggregates" not in st.session_state:
+    st.session_state["section_aggregates"] = IncrementalAggregates()
+aggregates = st.session_state["section_aggregates"].bind(df, {
+    "regions": selected_regions,
+    "years": selected_years,
+    "categories": selected_categories,
+    "segments": selected_segments,
+}, rows=filtered_rows)
 
 # Ambil data tahun sebelumnya untuk perhitungan delta di KPI
-prev_year_df = pd.DataFrame()
+prev_year_rows = None
 if selected_years and len(selected_years) == 1 and (min(all_years) < selected_years[0]):
     prev_year = selected_years[0] - 1
-    prev_year_df = df[
-        (df["Region"].isin(selected_regions)) &
-        (df["Order_Year"] == prev_year) &
-        (df["Category"].isin(selected_categories)) &
-        (df["Segment"].isin(selected_segments))
-    ]
+    prev_year_rows = select_rows(df, regions=selected_regions, years=[prev_year],
+                                 categories=selected_categories, segments=selected_segments)
 
 # ==================== BAGIAN: GAMBARAN UMUM EKSEKUTIF ====================
 if section == "Gambaran Umum Eksekutif":
     st.title("📊 Gambaran Umum Eksekutif - Metrik Kinerja")
 
     # Kartu KPI dengan Delta
-    current_sales = filtered_df['Sales'].sum()
-    current_profit = filtered_df['Profit'].sum()
-    current_profit_margin = current_profit / current_sales if current_sales else 0
-    current_orders = filtered_df['Order ID'].nunique()
-
-    prev_sales = prev_year_df['Sales'].sum() if not prev_year_df.empty else 0
-    prev_profit = prev_year_df['Profit'].sum() if not prev_year_df.empty else 0
-    prev_profit_margin = prev_profit / prev_sales if prev_sales else 0
-    prev_orders = prev_year_df['Order ID'].nunique() if not prev_year_df.empty else 0
+    current = kpi_totals(aggregates.sums("yearly"), filtered_rows.column('Order ID').nunique()) # Hitungan unik tidak aditif
+    current_sales = current["sales"]
+    current_profit = current["profit"]
+    current_profit_margin = current["profit_margin"]
+    current_orders = current["orders"]
+
+    prev = kpis(prev_year_rows.frame(["Sales", "Profit", "Order ID"])) if prev_year_rows is not None and not prev_year_rows.empty else {"sales": 0, "profit": 0, "profit_margin": 0, "orders": 0}
+    prev_sales = prev["sales"]
+    prev_profit = prev["profit"]
+    prev_profit_margin = prev["profit_margin"]
+    prev_orders = prev["orders"]
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -112,104 +129,137 @@ if section == "Gambaran Umum Eksekutif":
 
     st.markdown("---")
 
+    # Baru di-import setelah kartu KPI tampil di layar
+    import plotly.express as px
+
     col_exec1, col_exec2 = st.columns(2)
     with col_exec1:
         with st.expander("📈 Tren Penjualan & Keuntungan Tahunan", expanded=True):
-            yearly_summary = filtered_df.groupby("Order_Year")[["Sales", "Profit"]].sum().reset_index()
-            fig_year = px.bar(yearly_summary, x="Order_Year", y=["Sales", "Profit"],
-                              barmode="group",
-                              title="Penjualan dan Keuntungan per Tahun",
-                              labels={"Order_Year": "Tahun", "value": "Jumlah ($)"},
-                              color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'}, # Google colors
-                              template="plotly_white",
-                              hover_data={"Order_Year": True, "value": ":,.0f"})
-            fig_year.update_layout(height=400)
-            st.plotly_chart(fig_year, use_container_width=True)
+            slot_year = chart_slot(LOADING_TEXT)
 
     with col_exec2:
         with st.expander("📍 Keuntungan per Wilayah", expanded=True):
-            region_summary = filtered_df.groupby("Region")["Profit"].sum().reset_index()
-            fig_region = px.bar(region_summary, x="Region", y="Profit",
-                                 color="Profit", color_continuous_scale="RdYlGn",
-                                 title="Distribusi Keuntungan per Wilayah",
-                                 labels={"Profit": "Total Keuntungan ($)"},
-                                 template="plotly_white",
-                                 hover_data={"Profit": ":,.0f"})
-            fig_region.update_layout(height=400)
-            st.plotly_chart(fig_region, use_container_width=True)
+            slot_region = chart_slot(LOADING_TEXT)
     
     st.markdown("---")
 
     col_exec3, col_exec4 = st.columns(2)
     with col_exec3:
         with st.expander("🗓️ Tren Penjualan & Keuntungan Bulanan", expanded=True):
-            monthly_summary = filtered_df.groupby("Order_Month")[["Sales", "Profit"]].sum().reindex(
-                ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-            ).reset_index()
-            fig_month = px.line(monthly_summary, x="Order_Month", y=["Sales", "Profit"],
-                                markers=True,
-                                title="Tren Penjualan dan Keuntungan Bulanan",
-                                labels={"Order_Month": "Bulan", "value": "Jumlah ($)"},
-                                color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
-                                template="plotly_white",
-                                hover_data={"Order_Month": True, "value": ":,.0f"})
-            fig_month.update_layout(height=400)
-            st.plotly_chart(fig_month, use_container_width=True)
+            slot_month = chart_slot(LOADING_TEXT)
     
     with col_exec4:
         with st.expander("👥 Penjualan & Keuntungan per Segmen Pelanggan", expanded=True):
-            segment_summary = filtered_df.groupby("Segment")[["Sales", "Profit"]].sum().reset_index()
-            fig_segment = px.bar(segment_summary, x="Segment", y=["Sales", "Profit"],
-                                 barmode="group",
-                                 title="Penjualan dan Keuntungan per Segmen Pelanggan",
-                                 labels={"value": "Jumlah ($)"},
-                                 color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
-                                 template="plotly_white",
-                                 hover_data={"value": ":,.0f"})
-            fig_segment.update_layout(height=400)
-            st.plotly_chart(fig_segment, use_container_width=True)
+            slot_segment = chart_slot(LOADING_TEXT)
+
+    def build_yearly_chart():
+        yearly_summary = summed(aggregates.sums("yearly"), ["Sales", "Profit"])
+        fig_year = px.bar(yearly_summary, x="Order_Year", y=["Sales", "Profit"],
+                          barmode="group",
+                          title="Penjualan dan Keuntungan per Tahun",
+                          labels={"Order_Year": "Tahun", "value": "Jumlah ($)"},
+                          color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'}, # Google colors
+                          template="plotly_white",
+                          hover_data={"Order_Year": True, "value": ":,.0f"})
+        fig_year.update_layout(height=400)
+        return fig_year
+
+    def build_region_chart():
+        region_summary = summed(aggregates.sums("region"), ["Profit"])
+        fig_region = px.bar(region_summary, x="Region", y="Profit",
+                             color="Profit", color_continuous_scale="RdYlGn",
+                             title="Distribusi Keuntungan per Wilayah",
+                             labels={"Profit": "Total Keuntungan ($)"},
+                             template="plotly_white",
+                             hover_data={"Profit": ":,.0f"})
+        fig_region.update_layout(height=400)
+        return fig_region
+
+    def build_month_chart():
+        month_summary = summed(aggregates.sums("monthly"), ["Sales", "Profit"], order=MONTH_ORDER)
+        fig_month = px.line(month_summary, x="Order_Month", y=["Sales", "Profit"],
+                            markers=True,
+                            title="Tren Penjualan dan Keuntungan Bulanan",
+                            labels={"Order_Month": "Bulan", "value": "Jumlah ($)"},
+                            color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
+                            template="plotly_white",
+                            hover_data={"Order_Month": True, "value": ":,.0f"})
+        fig_month.update_layout(height=400)
+        return fig_month
+
+    def build_segment_chart():
+        segment_summary = summed(aggregates.sums("segment"), ["Sales", "Profit"])
+        fig_segment = px.bar(segment_summary, x="Segment", y=["Sales", "Profit"],
+                             barmode="group",
+                             title="Penjualan dan Keuntungan per Segmen Pelanggan",
+                             labels={"value": "Jumlah ($)"},
+                             color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
+                             template="plotly_white",
+                             hover_data={"value": ":,.0f"})
+        fig_segment.update_layout(height=400)
+        return fig_segment
+
+    render_section([
+        (slot_year, build_yearly_chart),
+        (slot_region, build_region_chart),
+        (slot_month, build_month_chart),
+        (slot_segment, build_segment_chart),
+    ])
 
 # ==================== BAGIAN: KATEGORI & PRODUK ====================
 elif section == "Kategori & Produk":
     st.title("📦 Analisis Kategori & Produk")
+    import plotly.express as px
 
     with st.expander("Penjualan & Keuntungan Hierarkis per Kategori dan Sub-Kategori", expanded=True):
-        category_summary = filtered_df.groupby(["Category", "Sub-Category"])[["Sales", "Profit"]].sum().reset_index()
-        fig_cat_treemap = px.treemap(category_summary, path=["Category", "Sub-Category"], values="Sales",
-                                     color="Profit", color_continuous_scale="RdYlGn",
-                                     title="Penjualan & Keuntungan per Kategori dan Sub-Kategori (Treemap)",
-                                     template="plotly_white",
-                                     hover_data={"Sales": ":,.0f", "Profit": ":,.0f"})
-        fig_cat_treemap.update_layout(height=600)
-        st.plotly_chart(fig_cat_treemap, use_container_width=True)
+        slot_treemap = chart_slot(LOADING_TEXT)
 
     col_prod1, col_prod2 = st.columns(2)
     with col_prod1:
         with st.expander("🔝 10 Produk Paling Menguntungkan", expanded=True):
-            top_products = filtered_df.groupby("Product Name")["Profit"].sum().sort_values(ascending=False).head(10).reset_index()
-            fig_top_prod = px.bar(top_products, x="Profit", y="Product Name", orientation="h",
-                                  title="10 Produk Paling Menguntungkan",
-                                  labels={"Profit": "Total Keuntungan ($)", "Product Name": "Produk"},
-                                  color="Profit", color_continuous_scale="Greens",
-                                  template="plotly_white",
-                                  hover_data={"Profit": ":,.0f"})
-            fig_top_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
-            st.plotly_chart(fig_top_prod, use_container_width=True)
+            slot_top_prod = chart_slot(LOADING_TEXT)
 
     with col_prod2:
         with st.expander("⬇️ 10 Produk Paling Merugi", expanded=True):
-            worst_products = filtered_df.groupby("Product Name")["Profit"].sum().sort_values(ascending=True).head(10).reset_index()
-            fig_worst_prod = px.bar(worst_products, x="Profit", y="Product Name", orientation="h",
-                                    title="10 Produk Paling Merugi",
-                                    labels={"Profit": "Total Keuntungan ($)", "Product Name": "Produk"},
-                                    color="Profit", color_continuous_scale="Reds_r", # Merah terbalik untuk kerugian
-                                    template="plotly_white",
-                                    hover_data={"Profit": ":,.0f"})
-            fig_worst_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
-            st.plotly_chart(fig_worst_prod, use_container_width=True)
+            slot_worst_prod = chart_slot(LOADING_TEXT)
     
     with st.expander("🔥 Heatmap Profitabilitas per Sub-Kategori", expanded=True):
-        sub_category_pivot = filtered_df.pivot_table(index="Sub-Category", columns="Category", values="Profit", aggfunc="sum").fillna(0)
+        slot_heatmap = chart_slot(LOADING_TEXT)
+
+    def build_treemap_chart():
+        cat_summary = summed(aggregates.sums("category"), ["Sales", "Profit"])
+        fig_cat_treemap = px.treemap(cat_summary, path=["Category", "Sub-Category"], values="Sales",
+                                     color="Profit", color_continuous_scale="RdYlGn",
+                                     title="Penjualan & Keuntungan per Kategori dan Sub-Kategori (Treemap)",
+                                     template="plotly_white",
+                                     hover_data={"Sales": ":,.0f", "Profit": ":,.0f"})
+        fig_cat_treemap.update_layout(height=600)
+        return fig_cat_treemap
+
+    def build_top_products_chart():
+        top_products = ranked(aggregates.sums("product"), "Profit", n=10)
+        fig_top_prod = px.bar(top_products, x="Profit", y="Product Name", orientation="h",
+                              title="10 Produk Paling Menguntungkan",
+                              labels={"Profit": "Total Keuntungan ($)", "Product Name": "Produk"},
+                              color="Profit", color_continuous_scale="Greens",
+                              template="plotly_white",
+                              hover_data={"Profit": ":,.0f"})
+        fig_top_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
+        return fig_top_prod
+
+    def build_worst_products_chart():
+        worst_products = ranked(aggregates.sums("product"), "Profit", n=10, ascending=True)
+        fig_worst_prod = px.bar(worst_products, x="Profit", y="Product Name", orientation="h",
+                                title="10 Produk Paling Merugi",
+                                labels={"Profit": "Total Keuntungan ($)", "Product Name": "Produk"},
+                                color="Profit", color_continuous_scale="Reds_r", # Merah terbalik untuk kerugian
+                                template="plotly_white",
+                                hover_data={"Profit": ":,.0f"})
+        fig_worst_prod.update_layout(yaxis={'categoryorder':'total ascending'}, height=400)
+        return fig_worst_prod
+
+    def build_heatmap_chart():
+        sub_category_pivot = subcategory_profit_pivot(filtered_rows.frame(["Sub-Category", "Category", "Profit"]))
         fig_heatmap = px.imshow(sub_category_pivot,
                                  labels=dict(x="Kategori", y="Sub-Kategori", color="Keuntungan"),
                                  x=sub_category_pivot.columns,
@@ -219,37 +269,113 @@ elif section == "Kategori & Produk":
                                  text_auto=".2s", # Tampilkan nilai pada heatmap
                                  aspect="auto")
         fig_heatmap.update_layout(height=600)
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        return fig_heatmap
+
+    render_section([
+        (slot_treemap, build_treemap_chart),
+        (slot_top_prod, build_top_products_chart),
+        (slot_worst_prod, build_worst_products_chart),
+        (slot_heatmap, build_heatmap_chart),
+    ])
+
+    with st.expander("🧮 Penjelajah Pivot", expanded=True):
+        no_slice = "(tidak ada)"
+        col_piv1, col_piv2, col_piv3, col_piv4 = st.columns(4)
+        pivot_rows = col_piv1.selectbox("Baris", PIVOT_DIMENSIONS, index=PIVOT_DIMENSIONS.index("State"))
+        column_options = [dim for dim in PIVOT_DIMENSIONS if dim != pivot_rows]
+        pivot_columns = col_piv2.selectbox("Kolom", column_options,
+                                           index=column_options.index("Sub-Category") if "Sub-Category" in column_options else 0)
+        pivot_facet = col_piv3.selectbox("Iris Berdasarkan", [no_slice] + [dim for dim in column_options if dim != pivot_columns])
+        pivot_measure = col_piv4.selectbox("Ukuran", PIVOT_MEASURES, index=PIVOT_MEASURES.index("Profit"))
+        col_piv5, col_piv6 = st.columns(2)
+        pivot_row_limit = col_piv5.slider("Maks. Baris", 5, 50, 20, help="Nilai lainnya dikelompokkan ke dalam \"Other\"")
+        pivot_column_limit = col_piv6.slider("Maks. Kolom", 3, 30, 12, help="Nilai lainnya dikelompokkan ke dalam \"Other\"")
+
+        pivot_facet = None if pivot_facet == no_slice else pivot_facet
+        cells = pivot_cells(filtered_rows, df.attrs["data_version"], filters_key, pivot_rows, pivot_columns,
+                            pivot_facet, pivot_measure, pivot_row_limit, pivot_column_limit)
+        if pivot_facet:
+            facet_value = st.selectbox(pivot_facet, list(cells[pivot_facet].cat.categories))
+            cells = cells[cells[pivot_facet] == facet_value]
+
+        if cells.empty:
+            st.info("Tidak ada data untuk filter saat ini.")
+        else:
+            pivot_table = pivot_grid(cells, pivot_rows, pivot_columns, pivot_measure)
+            fig_pivot = px.imshow(pivot_table,
+                                  labels=dict(x=pivot_columns, y=pivot_rows, color=pivot_measure),
+                                  x=[str(value) for value in pivot_table.columns],
+                                  y=[str(value) for value in pivot_table.index],
+                                  color_continuous_scale="RdYlGn",
+                                  title=f"{pivot_measure} per {pivot_rows} dan {pivot_columns}",
+                                  text_auto=".0%" if pivot_measure == "Profit Margin" else ".2s",
+                                  aspect="auto")
+            fig_pivot.update_layout(height=max(400, 28 * len(pivot_table.index)))
+            st.plotly_chart(fig_pivot, use_container_width=True)
+            st.caption(f"{len(cells)} sel tidak kosong")
 
 
 # ==================== BAGIAN: SEGMENTASI PELANGGAN ====================
 elif section == "Segmentasi Pelanggan":
     st.title("👥 Analisis Segmentasi Pelanggan")
+    import plotly.express as px
+
+    # Fitur pelanggan sepanjang waktu, dibentuk sekali dan diperbarui saat pesanan baru masuk.
+    # Segmen adalah atribut pelanggan, sehingga filter tersebut langsung diterapkan pada tabel.
+    customer_features = customer_feature_store().refresh(df)
+    segment_features = customer_features[customer_features["Segment"].isin(selected_segments)]
+    unfiltered_orders = (len(selected_regions) == len(all_regions) and len(selected_years) == len(all_years)
+                         and len(selected_categories) == len(all_categories))
 
     col_cust1, col_cust2 = st.columns(2)
     with col_cust1:
         with st.expander("📊 Rata-rata Keuntungan per Segmen", expanded=True):
-            avg_profit_seg = filtered_df.groupby("Segment")["Profit"].mean().reset_index()
-            fig_avg_profit_seg = px.pie(avg_profit_seg, names="Segment", values="Profit",
-                                        title="Rata-rata Keuntungan per Segmen Pelanggan",
-                                        template="plotly_white",
-                                        hover_data={"Profit": ":,.2f"})
-            fig_avg_profit_seg.update_traces(textinfo='percent+label', pull=[0.05 if s == avg_profit_seg['Segment'].max() else 0 for s in avg_profit_seg['Segment']])
-            st.plotly_chart(fig_avg_profit_seg, use_container_width=True)
+            slot_avg_profit_seg = chart_slot(LOADING_TEXT)
 
     with col_cust2:
         with st.expander("📈 Total Penjualan per Segmen", expanded=True):
-            total_sales_seg = filtered_df.groupby("Segment")["Sales"].sum().reset_index()
-            fig_total_sales_seg = px.bar(total_sales_seg, x="Segment", y="Sales",
-                                         title="Total Penjualan per Segmen Pelanggan",
-                                         labels={"Sales": "Total Penjualan ($)"},
-                                         color="Sales", color_continuous_scale="Blues",
-                                         template="plotly_white",
-                                         hover_data={"Sales": ":,.0f"})
-            st.plotly_chart(fig_total_sales_seg, use_container_width=True)
+            slot_total_sales_seg = chart_slot(LOADING_TEXT)
 
     with st.expander("💰 10 Pelanggan Paling Menguntungkan", expanded=True):
-        top_customers = filtered_df.groupby("Customer Name")["Profit"].sum().sort_values(ascending=False).head(10).reset_index()
+        slot_top_cust = chart_slot(LOADING_TEXT)
+
+    col_cust3, col_cust4 = st.columns(2)
+    with col_cust3:
+        with st.expander("🧭 Pelanggan per Segmen RFM", expanded=True):
+            slot_rfm_seg = chart_slot(LOADING_TEXT)
+
+    with col_cust4:
+        with st.expander("🏅 Peringkat Pelanggan (RFM)", expanded=True):
+            st.caption("Recency, frekuensi, dan nilai moneter sepanjang waktu per pelanggan; hanya mengikuti filter Segmen.")
+            rfm_ranking = segment_features.sort_values(["Monetary", "Profit"], ascending=False).head(20)
+            st.dataframe(rfm_ranking[["Customer Name", "Segment", "RFM Segment", "Recency", "Frequency", "Monetary",
+                                      "Profit", "Avg Discount", "First Order", "Last Order"]],
+                         use_container_width=True)
+
+    def build_avg_profit_segment_chart():
+        avg_profit_seg = averaged(aggregates.sums("segment"), ["Profit"])
+        fig_avg_profit_seg = px.pie(avg_profit_seg, names="Segment", values="Profit",
+                                    title="Rata-rata Keuntungan per Segmen Pelanggan",
+                                    template="plotly_white",
+                                    hover_data={"Profit": ":,.2f"})
+        fig_avg_profit_seg.update_traces(textinfo='percent+label', pull=[0.05 if s == avg_profit_seg['Segment'].max() else 0 for s in avg_profit_seg['Segment']])
+        return fig_avg_profit_seg
+
+    def build_total_sales_segment_chart():
+        total_sales_seg = summed(aggregates.sums("segment"), ["Sales"])
+        fig_total_sales_seg = px.bar(total_sales_seg, x="Segment", y="Sales",
+                                     title="Total Penjualan per Segmen Pelanggan",
+                                     labels={"Sales": "Total Penjualan ($)"},
+                                     color="Sales", color_continuous_scale="Blues",
+                                     template="plotly_white",
+                                     hover_data={"Sales": ":,.0f"})
+        return fig_total_sales_seg
+
+    def build_top_customers_chart():
+        if unfiltered_orders:
+            top_customers = segment_features.nlargest(10, "Profit")[["Customer Name", "Profit"]]
+        else:
+            top_customers = ranked(aggregates.sums("customer"), "Profit", n=10)
         fig_top_cust = px.bar(top_customers, x="Profit", y="Customer Name", orientation="h",
                               title="10 Pelanggan Paling Menguntungkan",
                               labels={"Profit": "Total Keuntungan ($)", "Customer Name": "Pelanggan"},
@@ -257,90 +383,211 @@ elif section == "Segmentasi Pelanggan":
                               template="plotly_white",
                               hover_data={"Profit": ":,.0f"})
         fig_top_cust.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_top_cust, use_container_width=True)
+        return fig_top_cust
+
+    def build_rfm_segment_chart():
+        rfm_summary = segment_features.groupby("RFM Segment").agg(Customers=("Monetary", "size"), Monetary=("Monetary", "sum")).reset_index()
+        fig_rfm_seg = px.bar(rfm_summary, x="RFM Segment", y="Customers",
+                             title="Jumlah Pelanggan per Segmen RFM",
+                             labels={"RFM Segment": "Segmen RFM", "Customers": "Pelanggan", "Monetary": "Total Penjualan ($)"},
+                             color="Monetary", color_continuous_scale="Blues",
+                             template="plotly_white",
+                             hover_data={"Monetary": ":,.0f"})
+        fig_rfm_seg.update_layout(xaxis={'categoryorder':'total descending'})
+        return fig_rfm_seg
+
+    render_section([
+        (slot_avg_profit_seg, build_avg_profit_segment_chart),
+        (slot_total_sales_seg, build_total_sales_segment_chart),
+        (slot_top_cust, build_top_customers_chart),
+        (slot_rfm_seg, build_rfm_segment_chart),
+    ])
 
 # ==================== BAGIAN: ANALISIS DISKON ====================
 elif section == "Analisis Diskon":
     st.title("💸 Analisis Diskon vs. Kinerja")
+    import plotly.express as px
 
     col_disc1, col_disc2 = st.columns(2)
     with col_disc1:
         with st.expander("📉 Margin Keuntungan vs. Diskon per Kategori", expanded=True):
-            fig_scatter_profit_margin = px.scatter(filtered_df, x="Discount", y="Profit Margin", color="Category",
-                                                   hover_name="Product Name",
-                                                   title="Margin Keuntungan vs. Diskon per Kategori Produk",
-                                                   labels={"Discount": "Tingkat Diskon", "Profit Margin": "Margin Keuntungan"},
-                                                   trendline="ols", # Tambahkan garis tren
-                                                   template="plotly_white",
-                                                   hover_data={"Sales": ":,.0f", "Profit": ":,.0f", "Discount": ":.2%"})
-            st.plotly_chart(fig_scatter_profit_margin, use_container_width=True)
+            slot_scatter = chart_slot(LOADING_TEXT)
 
     with col_disc2:
         with st.expander("📊 Distribusi Diskon", expanded=True):
-            fig_hist_discount = px.histogram(filtered_df, x="Discount", nbins=20,
-                                             title="Distribusi Tingkat Diskon",
-                                             labels={"Discount": "Tingkat Diskon"},
-                                             template="plotly_white")
-            st.plotly_chart(fig_hist_discount, use_container_width=True)
+            slot_hist = chart_slot(LOADING_TEXT)
     
     with st.expander("📈 Rata-rata Penjualan & Keuntungan per Tingkat Diskon", expanded=True):
-        discount_level_summary = filtered_df.groupby('Discount_Level')[['Sales', 'Profit']].mean().reset_index()
-        fig_avg_disc_level = px.bar(discount_level_summary, x='Discount_Level', y=['Sales', 'Profit'],
+        slot_disc_level = chart_slot(LOADING_TEXT)
+
+    def build_scatter_chart():
+        scatter_source = filtered_rows.frame(["Discount", "Profit Margin", "Category", "Product Name", "Sales", "Profit"])
+        fig_scatter_profit_margin = px.scatter(scatter_source, x="Discount", y="Profit Margin", color="Category",
+                                               hover_name="Product Name",
+                                               title="Margin Keuntungan vs. Diskon per Kategori Produk",
+                                               labels={"Discount": "Tingkat Diskon", "Profit Margin": "Margin Keuntungan"},
+                                               trendline="ols", # Tambahkan garis tren
+                                               template="plotly_white",
+                                               hover_data={"Sales": ":,.0f", "Profit": ":,.0f", "Discount": ":.2%"})
+        return fig_scatter_profit_margin
+
+    def build_hist_chart():
+        fig_hist_discount = px.histogram(filtered_rows.frame(["Discount"]), x="Discount", nbins=20,
+                                         title="Distribusi Tingkat Diskon",
+                                         labels={"Discount": "Tingkat Diskon"},
+                                         template="plotly_white")
+        return fig_hist_discount
+
+    def build_discount_level_chart():
+        disc_level_summary = averaged(aggregates.sums("discount_level"), ['Sales', 'Profit'], order=df['Discount_Level'].cat.categories)
+        fig_avg_disc_level = px.bar(disc_level_summary, x='Discount_Level', y=['Sales', 'Profit'],
                                     barmode='group',
                                     title="Rata-rata Penjualan & Keuntungan per Tingkat Diskon",
                                     labels={"value": "Rata-rata Jumlah ($)", "Discount_Level": "Tingkat Diskon"},
                                     color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
                                     template="plotly_white",
                                     hover_data={"value": ":,.0f"})
-        st.plotly_chart(fig_avg_disc_level, use_container_width=True)
+        return fig_avg_disc_level
+
+    render_section([
+        (slot_scatter, build_scatter_chart),
+        (slot_hist, build_hist_chart),
+        (slot_disc_level, build_discount_level_chart),
+    ])
+
+    with st.expander("🧪 Simulasi Batas Diskon", expanded=True):
+        st.caption("Membatasi diskon maksimum untuk satu kelompok. Harga katalog dan biaya satuan tetap; volume bereaksi terhadap diskon yang lebih rendah sesuai elastisitas yang dipilih.")
+        col_sim1, col_sim2, col_sim3 = st.columns(3)
+        sim_level = col_sim1.radio("Tingkat Kebijakan", ["Category", "Sub-Category"], horizontal=True)
+        sim_elasticity = col_sim3.slider("Elastisitas Volume", 0.0, 5.0, 0.0, 0.5,
+                                         help="2.0 berarti memangkas diskon 10 poin mengurangi volume sebesar 20%")
+        policy_grid = discount_policy_grid(filtered_rows, df.attrs["data_version"], filters_key, sim_level, sim_elasticity)
+
+        if policy_grid.empty:
+            st.info("Tidak ada data untuk filter saat ini.")
+        else:
+            sim_group = col_sim1.selectbox("Kelompok", sorted(policy_grid[sim_level].unique()))
+            scenario_curve = policy_grid[policy_grid[sim_level] == sim_group]
+            cap_options = scenario_curve["Max Discount"].tolist()
+            sim_cap = col_sim2.select_slider("Diskon Maksimum", options=cap_options, value=cap_options[-1],
+                                             format_func=lambda cap: f"{cap:.0%}")
+            scenario = scenario_curve[scenario_curve["Max Discount"] == sim_cap].iloc[0]
+
+            col_sim4, col_sim5 = st.columns(2)
+            col_sim4.metric("Proyeksi Total Penjualan", f"${scenario['Total Sales']:,.0f}", delta=f"{scenario['Sales Change']:,.0f}")
+            col_sim5.metric("Proyeksi Total Keuntungan", f"${scenario['Total Profit']:,.0f}", delta=f"{scenario['Profit Change']:,.0f}")
+
+            fig_what_if = px.line(scenario_curve, x="Max Discount", y=["Sales", "Profit"],
+                                  markers=True,
+                                  title=f"Proyeksi Penjualan & Keuntungan {sim_group} per Batas Diskon",
+                                  labels={"Max Discount": "Diskon Maksimum", "value": "Jumlah ($)"},
+                                  color_discrete_map={'Sales': '#4285F4', 'Profit': '#34A853'},
+                                  template="plotly_white",
+                                  hover_data={"value": ":,.0f"})
+            fig_what_if.add_vline(x=sim_cap, line_dash="dash", line_color="#777")
+            fig_what_if.update_layout(xaxis_tickformat=".0%")
+            st.plotly_chart(fig_what_if, use_container_width=True)
 
 
 # ==================== BAGIAN: DERET WAKTU ====================
 elif section == "Deret Waktu":
     st.title("📈 Analisis Deret Waktu")
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    from forecasting import FORECAST_DIMENSIONS, FORECAST_MEASURES
 
     time_series_metric = st.selectbox("Pilih Metrik untuk Deret Waktu:", ["Sales", "Profit", "Profit Margin"])
 
+    # Sesuaikan label sumbu y berdasarkan metrik yang dipilih
+    y_label = "Jumlah ($)"
+    if time_series_metric == "Profit Margin":
+        y_label = "Margin Keuntungan (%)"
+
     with st.expander(f"🗓️ Tren {time_series_metric} Bulanan", expanded=True):
-        monthly_trends = filtered_df.groupby("Order_Month")[[time_series_metric]].sum().reindex(
-            ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-        ).reset_index()
-        
-        # Sesuaikan label sumbu y berdasarkan metrik yang dipilih
-        y_label = "Jumlah ($)"
-        if time_series_metric == "Profit Margin":
-            y_label = "Margin Keuntungan (%)"
+        slot_monthly_trend = chart_slot(LOADING_TEXT)
+    
+    with st.expander(f"📊 Tren {time_series_metric} Tahunan", expanded=True):
+        slot_yearly_trend = chart_slot(LOADING_TEXT)
 
+    def build_monthly_trend_chart():
+        monthly_trends = summed(aggregates.sums("monthly"), [time_series_metric], order=MONTH_ORDER)
         fig_monthly_trend = px.line(monthly_trends, x="Order_Month", y=time_series_metric,
                                     markers=True,
                                     title=f"Tren {time_series_metric} Bulanan",
                                     labels={"Order_Month": "Bulan", time_series_metric: y_label},
                                     template="plotly_white",
                                     hover_data={time_series_metric: ":,.2f" if time_series_metric == "Profit Margin" else ":,.0f"})
-        st.plotly_chart(fig_monthly_trend, use_container_width=True)
-    
-    with st.expander(f"📊 Tren {time_series_metric} Tahunan", expanded=True):
-        yearly_trends = filtered_df.groupby("Order_Year")[[time_series_metric]].sum().reset_index()
-        
-        # Sesuaikan label sumbu y berdasarkan metrik yang dipilih
-        y_label = "Jumlah ($)"
-        if time_series_metric == "Profit Margin":
-            y_label = "Margin Keuntungan (%)"
+        return fig_monthly_trend
 
+    def build_yearly_trend_chart():
+        yearly_trends = summed(aggregates.sums("yearly"), [time_series_metric])
         fig_yearly_trend = px.line(yearly_trends, x="Order_Year", y=time_series_metric,
                                     markers=True,
                                     title=f"Tren {time_series_metric} Tahunan",
                                     labels={"Order_Year": "Tahun", time_series_metric: y_label},
                                     template="plotly_white",
                                     hover_data={time_series_metric: ":,.2f" if time_series_metric == "Profit Margin" else ":,.0f"})
-        st.plotly_chart(fig_yearly_trend, use_container_width=True)
+        return fig_yearly_trend
+
+    render_section([
+        (slot_monthly_trend, build_monthly_trend_chart),
+        (slot_yearly_trend, build_yearly_trend_chart),
+    ])
+
+    with st.expander("🔮 Prakiraan Bulanan", expanded=True):
+        col_fc1, col_fc2, col_fc3 = st.columns(3)
+        forecast_measure = col_fc1.selectbox("Metrik Prakiraan", FORECAST_MEASURES,
+                                             index=FORECAST_MEASURES.index(time_series_metric) if time_series_metric in FORECAST_MEASURES else 0)
+        forecast_slice = col_fc2.selectbox("Irisan Prakiraan", ["Semua"] + FORECAST_DIMENSIONS)
+        forecast_dimension = None if forecast_slice == "Semua" else forecast_slice
+        slice_values = [None] if forecast_dimension is None else sorted(df[forecast_dimension].unique())
+        forecast_value = None if forecast_dimension is None else col_fc3.selectbox(forecast_dimension, slice_values)
+
+        # Model di-fit di pool proses latar belakang, tidak pernah di rerun ini; semua irisan dari
+        # dimensi yang dipilih diantrekan sekaligus agar dipanaskan secara paralel
+        data_version = df.attrs["data_version"]
+        store = forecast_store()
+        store.warm_up(((forecast_measure, forecast_slice, value),
+                       slice_series(df, data_version, forecast_measure, forecast_dimension, value),
+                       data_version)
+                      for value in slice_values)
+        forecast_key = (forecast_measure, forecast_slice, forecast_value)
+        history = slice_series(df, data_version, forecast_measure, forecast_dimension, forecast_value)
+        forecast, forecast_is_current = store.request(forecast_key, history, data_version)
+
+        if forecast is None:
+            if store.error(forecast_key) is not None:
+                st.warning(f"Prakiraan untuk irisan ini gagal di-fit: {store.error(forecast_key)}")
+            else:
+                st.info("⏳ Model prakiraan untuk irisan ini sedang di-fit di latar belakang.")
+                st.button("Muat Ulang Prakiraan")
+        else:
+            if not forecast_is_current:
+                st.caption("Menampilkan hasil fit sebelumnya selagi model diperbarui dengan bulan-bulan baru.")
+            fig_forecast = go.Figure()
+            fig_forecast.add_trace(go.Scatter(x=forecast.index, y=forecast["Upper"], mode="lines",
+                                              line=dict(width=0), showlegend=False, hoverinfo="skip"))
+            fig_forecast.add_trace(go.Scatter(x=forecast.index, y=forecast["Lower"], mode="lines",
+                                              line=dict(width=0), fill="tonexty", fillcolor="rgba(52, 168, 83, 0.2)",
+                                              name="Interval 80%"))
+            fig_forecast.add_trace(go.Scatter(x=history.index, y=history.values, mode="lines+markers",
+                                              name="Aktual", line=dict(color="#4285F4")))
+            fig_forecast.add_trace(go.Scatter(x=forecast.index, y=forecast["Forecast"], mode="lines",
+                                              name="Prakiraan", line=dict(color="#34A853", dash="dash")))
+            fig_forecast.update_layout(title=f"Prakiraan {forecast_measure} Bulanan ({forecast_value or 'Semua'})",
+                                       xaxis_title="Bulan", yaxis_title="Jumlah ($)",
+                                       template="plotly_white", hovermode="x unified")
+            st.plotly_chart(fig_forecast, use_container_width=True)
+        st.caption("Prakiraan memakai seluruh riwayat irisan; filter sidebar tidak berlaku.")
 
 # ==================== BAGIAN: PETA PROFIT GEOGRAFIS ====================
 elif section == "Peta Profit Geografis":
     st.title("🗺️ Distribusi Keuntungan per Negara Bagian (Peta)")
+    import plotly.express as px
 
     with st.expander("📍 Keuntungan per Negara Bagian di Peta AS", expanded=True):
-        state_summary = filtered_df.groupby(["State", "State Code"])["Profit"].sum().reset_index()
+        state_summary = summed(aggregates.sums("state"), ["Profit"])
         fig_map = px.choropleth(
             state_summary,
             locations="State Code",
@@ -373,4 +620,8 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# Dicatat per proses; modul berat dimuat di latar belakang setelah halaman pertama tampil
+log_render(section, render_started)
+warm_imports()
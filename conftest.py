@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from superstore_data import add_derived_columns
+
+STATES = ["California", "New York", "Texas", "Washington", "Ohio", "Florida"]
+
+
+def superstore_frame(n=2000, seed=7):
+    # Synthetic order lines in the export's schema, run through the same derived columns as load_data()
+    rng = np.random.default_rng(seed)
+    order_dates = pd.Timestamp("2014-01-01") + pd.to_timedelta(rng.integers(0, 4 * 365, n), unit="D")
+    customers = rng.integers(0, 60, n)
+    raw = pd.DataFrame({
+        "Row ID": np.arange(1, n + 1),
+        "Order ID": [f"CA-{i // 3}" for i in range(n)],
+        "Order Date": order_dates,
+        "Ship Date": order_dates + pd.to_timedelta(rng.integers(0, 7, n), unit="D"),
+        "Customer ID": [f"CU-{c}" for c in customers],
+        "Customer Name": [f"Customer {c}" for c in customers],
+        "Region": rng.choice(["West", "East", "Central", "South"], n),
+        "State": rng.choice(STATES, n),
+        "Category": rng.choice(["Furniture", "Technology", "Office Supplies"], n),
+        "Sub-Category": rng.choice(["Chairs", "Phones", "Paper", "Binders"], n),
+        "Segment": rng.choice(["Consumer", "Corporate", "Home Office"], n),
+        "Product Name": rng.choice([f"Product {i}" for i in range(40)], n),
+        "Sales": rng.uniform(5, 500, n).round(2),
+        "Quantity": rng.integers(1, 10, n),
+        "Discount": rng.choice([0.0, 0.1, 0.2, 0.4, 0.7], n),
+    })
+    raw["Profit"] = (raw["Sales"] * rng.uniform(-0.5, 0.4, n)).round(4)
+    return add_derived_columns(raw)
+
+
+@pytest.fixture(scope="session")
+def df():
+    return superstore_frame()
@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ==================== CUSTOMER FEATURES (RFM) ====================
+# One row per Customer ID, built in a single groupby pass over the order lines.
+# Only additive/mergeable columns are stored (sums, counts, min/max dates), so a
+# batch of new orders can be folded into the table without rescanning old lines;
+# recency, averages and RFM scores are derived from those columns afterwards.
+
+BASE_AGGREGATIONS = {
+    "Customer Name": "first",
+    "Segment": "first",
+    "First Order": "min",
+    "Last Order": "max",
+    "Frequency": "sum",
+    "Monetary": "sum",
+    "Profit": "sum",
+    "Discount Sum": "sum",
+    "Order Lines": "sum",
+}
+
+# Columns the features are built from; seen order lines are fingerprinted on these
+SOURCE_COLUMNS = ["Customer ID", "Customer Name", "Segment", "Order ID", "Order Date", "Sales", "Profit", "Discount"]
+
+RFM_SEGMENT_LABELS = {
+    "en": ["Champions", "Loyal Customers", "Recent Customers", "At Risk", "Need Attention", "Hibernating"],
+    "id": ["Juara", "Pelanggan Setia", "Pelanggan Baru", "Berisiko", "Perlu Perhatian", "Tidak Aktif"],
+}
+
+
+def _order_line_features(orders):
+    return orders.groupby("Customer ID", sort=False).agg(**{
+        "Customer Name": ("Customer Name", "first"),
+        "Segment": ("Segment", "first"),
+        "First Order": ("Order Date", "min"),
+        "Last Order": ("Order Date", "max"),
+        "Frequency": ("Order ID", "nunique"),
+        "Monetary": ("Sales", "sum"),
+        "Profit": ("Profit", "sum"),
+        "Discount Sum": ("Discount", "sum"),
+        "Order Lines": ("Discount", "size"),
+    })
+
+
+def _score(values, ascending=True, bins=5):
+    # Quantile score 1..bins; ranking first keeps qcut happy with heavily tied values
+    bins = min(bins, len(values))
+    if bins == 0:
+        return pd.Series(dtype="int64", index=values.index)
+    scores = pd.qcut(values.rank(method="first"), bins, labels=False) + 1
+    return scores if ascending else bins + 1 - scores
+
+
+def add_rfm_scores(features, as_of=None, lang="en"):
+    features = features.copy()
+    as_of = features["Last Order"].max() if as_of is None else as_of
+    features["Recency"] = (as_of - features["Last Order"]).dt.days
+    features["Avg Discount"] = features["Discount Sum"] / features["Order Lines"]
+
+    features["R Score"] = _score(features["Recency"], ascending=False)
+    features["F Score"] = _score(features["Frequency"])
+    features["M Score"] = _score(features["Monetary"])
+    fm = (features["F Score"] + features["M Score"]) / 2
+    r = features["R Score"]
+    features["RFM Segment"] = np.select(
+        [(r >= 4) & (fm >= 4), (r >= 3) & (fm >= 3), r >= 4, (r <= 2) & (fm >= 3), r == 3],
+        RFM_SEGMENT_LABELS[lang][:5],
+        default=RFM_SEGMENT_LABELS[lang][5],
+    )
+    return features
+
+
+def build_customer_features(df, lang="en"):
+    return add_rfm_scores(_order_line_features(df), lang=lang)
+
+
+def update_customer_features(features, new_orders, lang="en"):
+    # Assumes orders arrive whole: an Order ID in new_orders has not been seen before
+    if new_orders.empty:
+        return features
+    combined = pd.concat([features[list(BASE_AGGREGATIONS)], _order_line_features(new_orders)])
+    merged = combined.groupby(level=0, sort=False).agg(BASE_AGGREGATIONS)
+    return add_rfm_scores(merged, lang=lang)
+
+
+def lines_fingerprint(orders):
+    # Order-independent and additive: the fingerprint of a union is the sum of the parts
+    hashes = pd.util.hash_pandas_object(orders[SOURCE_COLUMNS], index=False).to_numpy()
+    return int(hashes.sum(dtype=np.uint64)), len(hashes)
+
+
+class CustomerFeatureStore:
+    """Process-wide customer feature table that folds in orders it has not seen yet.
+
+    New orders are folded in only if the order lines already seen are unchanged; if any
+    were edited or removed, the table is rebuilt from scratch.
+    """
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+        self.features = None
+        self.version = None
+        self.order_ids = pd.Index([])
+        self.fingerprint = None
+        self._lock = threading.Lock()
+
+    def refresh(self, df):
+        version = df.attrs.get("data_version")
+        with self._lock:
+            if self.features is not None and version is not None and version == self.version:
+                return self.features
+            seen = df["Order ID"].isin(self.order_ids)
+            if self.features is None or lines_fingerprint(df[seen]) != self.fingerprint:
+                self.features = build_customer_features(df, lang=self.lang)
+                self.order_ids = pd.Index(df["Order ID"].unique())
+                self.fingerprint = lines_fingerprint(df)
+            else:
+                new_orders = df[~seen]
+                self.features = update_customer_features(self.features, new_orders, lang=self.lang)
+                self.order_ids = self.order_ids.append(pd.Index(new_orders["Order ID"].unique()))
+                new_hash, new_lines = lines_fingerprint(new_orders)
+                self.fingerprint = ((self.fingerprint[0] + new_hash) % 2**64, self.fingerprint[1] + new_lines)
+            self.version = version
+            return self.features
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# ==================== DISCOUNT WHAT-IF SIMULATOR ====================
+# A policy caps the maximum discount of one Category/Sub-Category. Every (group, cap)
+# policy in the grid is evaluated in one NumPy broadcast over the order lines:
+#   list price = Sales / (1 - Discount), unit cost = Sales - Profit (both held fixed)
+#   new discount = min(Discount, cap)
+#   volume = 1 + elasticity * (new discount - Discount), floored at 0
+# so with elasticity 0 the customer buys the same items at the higher price.
+
+DISCOUNT_CAPS = np.round(np.arange(0.0, 0.85, 0.05), 2)  # 0% .. 80%, the highest discount in the data
+
+RESULT_COLUMNS = ["Max Discount", "Sales", "Profit", "Sales Change", "Profit Change", "Total Sales", "Total Profit"]
+
+
+def simulate_discount_caps(df, level="Category", caps=DISCOUNT_CAPS, elasticity=0.0):
+    caps = np.asarray(caps, dtype=float)
+    if df.empty:
+        return pd.DataFrame(columns=[level] + RESULT_COLUMNS)
+
+    codes, groups = pd.factorize(df[level], sort=True)
+    discount = df["Discount"].to_numpy(dtype=float)
+    sales = df["Sales"].to_numpy(dtype=float)
+    profit = df["Profit"].to_numpy(dtype=float)
+    list_price = sales / (1 - discount)
+    cost = sales - profit
+
+    # (lines, caps) matrices: every policy for every line in one pass
+    new_discount = np.minimum(discount[:, None], caps[None, :])
+    volume = np.clip(1 + elasticity * (new_discount - discount[:, None]), 0, None)
+    new_sales = list_price[:, None] * (1 - new_discount) * volume
+    new_profit = new_sales - cost[:, None] * volume
+
+    # Per-group sums of each column via one sorted reduceat instead of a loop over groups
+    order = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[order], np.arange(len(groups)))
+    group_sales = np.add.reduceat(new_sales[order], starts, axis=0)
+    group_profit = np.add.reduceat(new_profit[order], starts, axis=0)
+    base_sales = np.bincount(codes, weights=sales, minlength=len(groups))[:, None]
+    base_profit = np.bincount(codes, weights=profit, minlength=len(groups))[:, None]
+
+    # Only the capped group changes, so the selection total moves by that group's delta
+    sales_change = group_sales - base_sales
+    profit_change = group_profit - base_profit
+    return pd.DataFrame({
+        level: np.repeat(np.asarray(groups), len(caps)),
+        "Max Discount": np.tile(caps, len(groups)),
+        "Sales": group_sales.ravel(),
+        "Profit": group_profit.ravel(),
+        "Sales Change": sales_change.ravel(),
+        "Profit Change": profit_change.ravel(),
+        "Total Sales": (sales.sum() + sales_change).ravel(),
+        "Total Profit": (profit.sum() + profit_change).ravel(),
+    })
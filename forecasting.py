@@ -0,0 +1,147 @@
+import itertools
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ==================== FORECASTING ====================
+# Monthly Sales/Profit forecasts per slice (all data, one Region, one Category, ...).
+# Fits run in a background process pool and are cached by slice key and data version;
+# a page render only ever reads whatever fit is ready and schedules missing work.
+# When new months arrive the cached SARIMAX state is extended with append(refit=False)
+# and the parameters are only re-estimated (warm-started) every FULL_REFIT_EVERY months.
+
+FORECAST_MEASURES = ["Sales", "Profit"]
+FORECAST_DIMENSIONS = ["Region", "Category", "Segment"]
+FORECAST_HORIZON = 12
+FULL_REFIT_EVERY = 6
+CONFIDENCE_ALPHA = 0.2  # 80% interval
+
+_stores = weakref.WeakSet()
+
+
+def monthly_series(df, measure, dimension=None, value=None):
+    # Monthly totals over the whole data range, so every slice shares the same calendar
+    months = pd.date_range(df["Order Date"].min().to_period("M").to_timestamp(),
+                           df["Order Date"].max().to_period("M").to_timestamp(), freq="MS")
+    rows = df[["Order Date", measure]] if dimension is None else df.loc[df[dimension] == value, ["Order Date", measure]]
+    series = rows.groupby(rows["Order Date"].dt.to_period("M").dt.to_timestamp())[measure].sum()
+    return series.reindex(months, fill_value=0.0).asfreq("MS")
+
+
+def _forecast_frame(results, horizon):
+    prediction = results.get_forecast(horizon)
+    interval = prediction.conf_int(alpha=CONFIDENCE_ALPHA)
+    return pd.DataFrame({
+        "Forecast": prediction.predicted_mean,
+        "Lower": interval.iloc[:, 0],
+        "Upper": interval.iloc[:, 1],
+    })
+
+
+def fit_model(series, start_params=None, horizon=FORECAST_HORIZON):
+    # Runs in a worker process; statsmodels is imported there, not in the page
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    seasonal_order = (0, 1, 1, 12) if len(series) >= 36 else (0, 0, 0, 0)
+    model = SARIMAX(series, order=(1, 1, 1), seasonal_order=seasonal_order,
+                    enforce_stationarity=False, enforce_invertibility=False)
+    # Warm start from the previous fit unless the model shape changed (e.g. seasonality enabled)
+    if start_params is not None and len(start_params) != len(model.start_params):
+        start_params = None
+    results = model.fit(start_params=start_params, disp=False)
+    return {"results": results, "forecast": _forecast_frame(results, horizon), "appended": 0}
+
+
+def extend_model(results, new_months, appended, horizon=FORECAST_HORIZON):
+    # New observations go through the fitted state space model without re-estimating
+    results = results.append(new_months, refit=False)
+    return {"results": results, "forecast": _forecast_frame(results, horizon), "appended": appended + len(new_months)}
+
+
+def shutdown_stores():
+    """Stop the fitting pool of every ForecastStore in this process.
+
+    Call before a process that rendered the Time Series page exits outside a normal
+    interpreter shutdown (e.g. a multiprocessing worker), whose exit would otherwise
+    wait on the pool's idle workers forever.
+    """
+    for store in list(_stores):
+        store.close()
+
+
+class ForecastStore:
+    """Process-wide cache of fitted slice models with a background fitting pool."""
+
+    def __init__(self, max_workers=None):
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._entries = {}  # slice key -> {"version", "series", "results", "forecast", "appended", "sequence"}
+        self._pending = {}  # slice key -> version being fitted
+        self._errors = {}  # slice key -> (version, exception) of the last failed fit
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()  # done callbacks may run inline while _schedule holds it
+        self._closed = False
+        # The pool's workers are non-daemon; shut it down when the store goes away or at exit
+        self._finalizer = weakref.finalize(self, self._pool.shutdown, wait=False, cancel_futures=True)
+        _stores.add(self)
+
+    def close(self, wait=True):
+        # With wait=False the workers' stop signal can be lost if the process exits right after
+        with self._lock:
+            self._closed = True
+        if self._finalizer.detach():
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def request(self, key, series, version):
+        """Return (forecast frame or None, is_current) without ever fitting in the caller."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == version:
+                return entry["forecast"], True
+            if entry is not None and entry["series"].equals(series):
+                # Data changed elsewhere; this slice's history did not
+                entry["version"] = version
+                return entry["forecast"], True
+            failed_version, _ = self._errors.get(key, (None, None))
+            if not self._closed and self._pending.get(key) != version and failed_version != version:
+                self._schedule(key, series, version, entry)
+            return (entry["forecast"] if entry else None), False
+
+    def error(self, key):
+        return self._errors.get(key, (None, None))[1]
+
+    def warm_up(self, requests):
+        # requests: iterable of (key, series, version); fitted in parallel across the pool
+        for key, series, version in requests:
+            self.request(key, series, version)
+
+    def _schedule(self, key, series, version, entry):
+        old = entry["series"] if entry else None
+        extends = (old is not None and len(series) > len(old) and series.index[:len(old)].equals(old.index)
+                   and np.allclose(series.iloc[:len(old)].to_numpy(), old.to_numpy()))
+        if extends and entry["appended"] + len(series) - len(old) < FULL_REFIT_EVERY:
+            future = self._pool.submit(extend_model, entry["results"], series.iloc[len(old):], entry["appended"])
+        else:
+            start_params = entry["results"].params if entry else None
+            future = self._pool.submit(fit_model, series, start_params)
+        self._pending[key] = version
+        self._errors.pop(key, None)
+        sequence = next(self._sequence)
+        future.add_done_callback(lambda done: self._finish(key, series, version, sequence, done))
+
+    def _finish(self, key, series, version, sequence, future):
+        with self._lock:
+            if self._pending.get(key) == version:
+                del self._pending[key]
+            try:
+                fitted = future.result()
+            except Exception as exc:
+                self._errors[key] = (version, exc)
+                return
+            current = self._entries.get(key)
+            if current is None or current["sequence"] < sequence:
+                # A fit scheduled later may already have finished first
+                self._entries[key] = {"version": version, "series": series, "sequence": sequence, **fitted}
@@ -0,0 +1,92 @@
+from superstore_data import AGGREGATE_SPECS, FILTER_COLUMNS, ROW_COUNT, filter_mask, group_sums, select_rows
+
+# ==================== INCREMENTAL FILTER RE-EVALUATION ====================
+# Section aggregates are kept per session as additive sums plus a row count. When the
+# sidebar selection changes in a single filter (one region deselected, one year added),
+# only the rows of the added/removed values are grouped and added to/subtracted from the
+# cached sums. Anything non-additive (e.g. distinct order counts) is still computed from
+# the full selection by the caller. The sums and the views over them (summed, averaged,
+# ranked) are the ones in superstore_data, shared with the API.
+
+
+def _combine(sums, delta, sign):
+    combined = sums.add(delta * sign, fill_value=0)
+    return combined[combined[ROW_COUNT] > 0]
+
+
+class IncrementalAggregates:
+    """Per-session cache of additive section aggregates, updated by selection deltas."""
+
+    def __init__(self, specs=AGGREGATE_SPECS, max_incremental_updates=50):
+        self.specs = specs
+        # Periodic full recomputes keep floating point drift from repeated +/- in check
+        self.max_incremental_updates = max_incremental_updates
+        self.df = None
+        self.selection = None
+        self.rows = None
+        self._entries = {}
+        self._masks = {}
+
+    def bind(self, df, selection, rows=None):
+        # selection: filter name (see FILTER_COLUMNS) -> selected values for this rerun;
+        # rows: the rerun's RowSelection for that selection, shared so columns are taken once
+        self.df = df
+        self.selection = {name: frozenset(values) for name, values in selection.items()}
+        self.rows = rows
+        self._masks = {}
+        return self
+
+    def sums(self, name):
+        entry = self._entries.get(name)
+        version = self.df.attrs.get("data_version")
+        if entry is None or entry["version"] != version or entry["updates"] >= self.max_incremental_updates:
+            entry = self._full(name, version)
+        else:
+            entry = self._incremental(name, entry)
+        self._entries[name] = entry
+        return entry["sums"]
+
+    def _selected_rows(self, columns):
+        if self.rows is None:
+            self.rows = select_rows(self.df, **{name: list(values) for name, values in self.selection.items()})
+        return self.rows.frame(columns)
+
+    def _full(self, name, version):
+        keys, columns = self.specs[name]
+        sums = group_sums(self._selected_rows(keys + columns), keys, columns)
+        return {"version": version, "selection": self.selection, "sums": sums, "updates": 0}
+
+    def _delta_masks(self, dim, old, new):
+        # Shared by every aggregate that moves from the same previous selection
+        key = (dim, old)
+        if key not in self._masks:
+            others = {name: list(values) for name, values in self.selection.items() if name != dim}
+            base = filter_mask(self.df, **others)
+            column = self.df[FILTER_COLUMNS[dim]]
+            added = base & column.isin(list(new - old))
+            removed = base & column.isin(list(old - new))
+            selected = int((base & column.isin(list(new))).sum())
+            self._masks[key] = (added, removed, selected)
+        return self._masks[key]
+
+    def _incremental(self, name, entry):
+        changed = [dim for dim in self.selection if self.selection[dim] != entry["selection"].get(dim)]
+        if not changed:
+            return entry
+        if len(changed) > 1:
+            return self._full(name, entry["version"])
+
+        dim = changed[0]
+        added, removed, selected = self._delta_masks(dim, entry["selection"][dim], self.selection[dim])
+        if added.sum() + removed.sum() > selected:
+            # The change is bigger than the new answer (e.g. all but one year removed)
+            return self._full(name, entry["version"])
+
+        keys, columns = self.specs[name]
+        sums = entry["sums"]
+        if added.any():
+            sums = _combine(sums, group_sums(self.df.loc[added, keys + columns], keys, columns), 1)
+        if removed.any():
+            sums = _combine(sums, group_sums(self.df.loc[removed, keys + columns], keys, columns), -1)
+        return {"version": entry["version"], "selection": self.selection, "sums": sums, "updates": entry["updates"] + 1}
+
@@ -0,0 +1,126 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+# ==================== MULTI-SOURCE INGESTION ====================
+# Merges several store exports (one per country or business unit) into one dataset in
+# the schema of final_data_superstore.csv. Sources come from a directory of CSV files or
+# a JSON manifest with per-source settings:
+#
+#   {"sources": [
+#       {"path": "exports/us.csv", "name": "US", "encoding": "ISO-8859-1", "date_format": "%m/%d/%Y"},
+#       {"path": "exports/eu.csv", "encoding": "utf-8", "rename": {"Row_ID": "Row ID"}}
+#   ]}
+#
+# Each source is parsed and normalized in its own worker process, so wall-clock time
+# follows the largest file and the core count rather than the number of files. Order
+# lines found in more than one export are kept once (first source wins).
+#
+#   python ingest.py exports/ --output merged_superstore.csv
+#   SUPERSTORE_SOURCES=exports/manifest.json streamlit run app2.py
+
+DEFAULT_ENCODING = "ISO-8859-1"
+
+RAW_COLUMNS = [
+    "Row ID", "Order ID", "Order Date", "Ship Date", "Ship Mode", "Customer ID", "Customer Name",
+    "Segment", "Country", "City", "State", "Postal Code", "Region", "Product ID", "Category",
+    "Sub-Category", "Product Name", "Sales", "Quantity", "Discount", "Profit",
+]
+
+# An order line is the same line in every export it appears in
+DEDUPE_KEY = ["Row ID", "Order ID", "Product ID"]
+
+
+# ==================== SOURCES ====================
+def discover_sources(location):
+    # A manifest file, or a directory whose CSV files all use the default settings
+    location = Path(location)
+    if location.is_dir():
+        return [{"path": str(path), "name": path.stem} for path in sorted(location.glob("*.csv"))]
+    with open(location, encoding="utf-8") as manifest:
+        entries = json.load(manifest)
+    if isinstance(entries, dict):
+        entries = entries.get("sources", [])
+    sources = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        if "path" not in entry:
+            raise ValueError(f"manifest entry without a path: {entry!r}")
+        path = Path(entry["path"])
+        if not path.is_absolute():
+            path = location.parent / path
+        sources.append({**entry, "path": str(path), "name": entry.get("name", path.stem)})
+    return sources
+
+
+# ==================== PARSE & NORMALIZE ====================
+def normalize(df, name="source"):
+    missing = [column for column in RAW_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"{name}: missing columns {', '.join(missing)}")
+    df = df[RAW_COLUMNS].copy()
+    df["Delivery Time"] = (df["Ship Date"] - df["Order Date"]).dt.days
+    df["Order_Month"] = df["Order Date"].dt.strftime("%B")
+    df["Order_Day"] = df["Order Date"].dt.day_name()
+    df["Order_Year"] = df["Order Date"].dt.year
+    df["Profit_Ratio"] = (df["Profit"] / df["Sales"].where(df["Sales"] != 0)).fillna(0.0)
+    df["Profit_Per_Quantity"] = df["Profit"] / df["Quantity"]
+    return df
+
+
+def parse_source(source):
+    # Runs in a worker process
+    started = time.perf_counter()
+    df = pd.read_csv(source["path"], encoding=source.get("encoding", DEFAULT_ENCODING))
+    df = df.rename(columns=source.get("rename", {}))
+    for column in ("Order Date", "Ship Date"):
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], format=source.get("date_format"))
+    df = normalize(df, source["name"])
+    return df, time.perf_counter() - started
+
+
+def merge(frames):
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.drop_duplicates(subset=DEDUPE_KEY, keep="first").reset_index(drop=True)
+
+
+def ingest(location, max_workers=None, timings=None):
+    """Parse every source of a manifest or directory in parallel and merge them."""
+    sources = discover_sources(location)
+    if not sources:
+        raise ValueError(f"no sources found in {location}")
+    if len(sources) == 1:
+        results = [parse_source(sources[0])]
+    else:
+        # spawn: the dashboards call this from a threaded Streamlit server
+        workers = min(len(sources), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(parse_source, sources))
+    if timings is not None:
+        timings.update({source["name"]: elapsed for source, (_, elapsed) in zip(sources, results)})
+    return merge([frame for frame, _ in results])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge several Superstore exports into one dataset")
+    parser.add_argument("sources", help="directory of CSV exports or a JSON manifest")
+    parser.add_argument("--output", required=True, help="CSV file to write the merged dataset to")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: one per core)")
+    args = parser.parse_args()
+
+    timings = {}
+    started = time.perf_counter()
+    merged = ingest(args.sources, max_workers=args.workers, timings=timings)
+    elapsed = time.perf_counter() - started
+    for name, seconds in timings.items():
+        print(f"  {name:<24} parsed in {seconds:.2f}s")
+    print(f"{len(merged)} order lines from {len(timings)} sources in {elapsed:.2f}s")
+    merged.to_csv(args.output, index=False, encoding=DEFAULT_ENCODING, errors="replace")
@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+
+# ==================== LOAD TEST ====================
+# Starts one `streamlit run` server for app1.py / app2.py and connects N simulated
+# analysts to it over the same websocket protocol the browser uses. Each session switches
+# sections and toggles the Region / Order Year / Category / Segment filters, so all of
+# them share one server process, its st.cache_data / st.cache_resource, its GIL and its
+# forecast pool -- i.e. what one replica has to serve.
+#
+#   python load_test.py --app app2.py --sessions 8 --reruns 30 --rows 100000
+#
+# Sessions are added one at a time first: after each one's first page load the RSS of
+# the server (with its worker processes) is sampled, and the slope over those samples is
+# the memory each additional session costs. Then all sessions rerun concurrently and the
+# rerun latency percentiles, throughput, peak server RSS and the RSS once the reruns are
+# done are reported. RSS is read from /proc, so the memory figures need Linux.
+
+ROOT = Path(__file__).resolve().parent
+SOURCE_CSV = ROOT / "final_data_superstore.csv"
+
+# Sidebar multiselects in the order the apps create them: Region, Order Year, Category, Segment
+FILTER_WIDGETS = 4
+SECTION_SWITCH_PROBABILITY = 0.3
+SIDEBAR = 1  # delta_path root of st.sidebar
+RSS_SAMPLE_INTERVAL = 0.2
+RSS_SETTLE_MB = 1.0
+RSS_SETTLE_TIMEOUT = 10.0
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def slope(xs, ys):
+    # Least-squares slope; None with fewer than two points
+    if len(xs) < 2:
+        return None
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+            / sum((x - mean_x) ** 2 for x in xs))
+
+
+def scaled_dataset(rows, directory):
+    # Replicate the export with fresh Row IDs / Order IDs until it has the requested size
+    base = pd.read_csv(SOURCE_CSV, encoding="ISO-8859-1")
+    copies = -(-rows // len(base))
+    frames = []
+    for copy in range(copies):
+        frame = base.copy()
+        frame["Row ID"] = frame["Row ID"] + copy * len(base)
+        if copy:
+            frame["Order ID"] = frame["Order ID"] + f"-{copy}"
+        frames.append(frame)
+    path = Path(directory) / f"superstore_{rows}.csv"
+    pd.concat(frames, ignore_index=True).head(rows).to_csv(path, index=False, encoding="ISO-8859-1")
+    return path
+
+
+# ==================== SERVER ====================
+def tree_rss_mb(pid):
+    # RSS of a process and all of its descendants (the forecast pool's workers, ...)
+    children = {}
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit():
+            try:
+                stat = (entry / "stat").read_text()
+            except OSError:
+                continue
+            parent = int(stat.rsplit(")", 1)[1].split()[1])
+            children.setdefault(parent, []).append(int(entry.name))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            total += int((Path("/proc") / str(current) / "statm").read_text().split()[1])
+        except (OSError, ValueError):
+            pass
+        pending.extend(children.get(current, []))
+    return total * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def start_server(app, port, env, timeout):
+    command = [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+               "--server.port", str(port), "--browser.gatherUsageStats", "false",
+               "--server.fileWatcherType", "none"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout and server.poll() is None:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.1)
+    stop_server(server)
+    raise RuntimeError(f"streamlit run {app} did not become healthy within {timeout:.0f}s")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+# ==================== SESSIONS ====================
+class Session:
+    """One browser tab: a websocket to the server plus the sidebar widget values it sends."""
+
+    def __init__(self, url, seed, timeout):
+        self.url = url
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.ws = None
+        self.section = None  # (widget id, option count, selected index)
+        self.filters = []  # [widget id, option count, selected indices] per sidebar multiselect
+        self.latencies = []
+        self.first_run = None
+        self.errors = 0
+
+    async def open(self):
+        from tornado.websocket import websocket_connect
+
+        self.ws = await websocket_connect(f"{self.url}/_stcore/stream", subprotocols=["streamlit"])
+        self.first_run = await self.rerun()
+        return self
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def rerun(self):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        states = message.rerun_script.widget_states.widgets
+        if self.section is not None:
+            state = states.add()
+            state.id, state.int_value = self.section[0], self.section[2]
+        for widget_id, _, selected in self.filters:
+            state = states.add()
+            state.id = widget_id
+            state.int_array_value.data.extend(selected)
+        started = time.perf_counter()
+        await self.ws.write_message(message.SerializeToString(), binary=True)
+        await asyncio.wait_for(self._until_finished(), self.timeout)
+        return time.perf_counter() - started
+
+    async def _until_finished(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        discover = self.section is None
+        while True:
+            raw = await self.ws.read_message()
+            if raw is None:
+                raise ConnectionError("server closed the session")
+            message = ForwardMsg()
+            message.ParseFromString(raw)
+            kind = message.WhichOneof("type")
+            if kind == "script_finished":
+                self.errors += message.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR
+                return
+            if kind != "delta" or message.delta.WhichOneof("type") != "new_element":
+                continue
+            element = message.delta.new_element
+            widget = element.WhichOneof("type")
+            if widget == "exception":
+                self.errors += 1
+            elif discover and message.metadata.delta_path[0] == SIDEBAR:
+                # Sidebar widgets are identified on the first run, in creation order
+                if widget == "selectbox" and self.section is None:
+                    self.section = (element.selectbox.id, len(element.selectbox.options), element.selectbox.default)
+                elif widget == "multiselect" and len(self.filters) < FILTER_WIDGETS:
+                    self.filters.append([element.multiselect.id, len(element.multiselect.options),
+                                         list(element.multiselect.default)])
+
+    def change_selection(self):
+        if self.rng.random() < SECTION_SWITCH_PROBABILITY:
+            widget_id, options, _ = self.section
+            self.section = (widget_id, options, self.rng.randrange(options))
+            return
+        # Toggle one value of one filter, never leaving the filter empty
+        _, options, selected = self.rng.choice(self.filters)
+        value = self.rng.randrange(options)
+        if value in selected and len(selected) > 1:
+            selected.remove(value)
+        elif value not in selected:
+            selected.append(value)
+            selected.sort()
+
+    async def run(self, reruns, think_time):
+        for _ in range(reruns):
+            if think_time:
+                await asyncio.sleep(self.rng.uniform(0, 2 * think_time))
+            self.change_selection()
+            try:
+                self.latencies.append(await self.rerun())
+            except asyncio.TimeoutError:
+                self.errors += 1
+                return
+
+
+async def settled_rss_mb(pid):
+    # Background work started by a page load (warm_imports, forecast fits) keeps growing
+    # the server for a while; wait until it is flat before attributing memory to a session
+    previous, started = tree_rss_mb(pid), time.perf_counter()
+    while time.perf_counter() - started < RSS_SETTLE_TIMEOUT:
+        await asyncio.sleep(RSS_SAMPLE_INTERVAL * 2)
+        current = tree_rss_mb(pid)
+        if abs(current - previous) < RSS_SETTLE_MB:
+            return current
+        previous = current
+    return previous
+
+
+async def sample_rss(pid, samples, stop):
+    while not stop.is_set():
+        samples.append(tree_rss_mb(pid))
+        try:
+            await asyncio.wait_for(stop.wait(), RSS_SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def drive(url, pid, sessions, reruns, seed, timeout, think_time):
+    idle_mb = await settled_rss_mb(pid)
+    opened, ramp_mb = [], []
+    try:
+        # Ramp: add the sessions one at a time and measure the server after each first load
+        for index in range(sessions):
+            opened.append(await Session(url, seed + index, timeout).open())
+            ramp_mb.append(await settled_rss_mb(pid))
+
+        samples, stop = [], asyncio.Event()
+        sampler = asyncio.create_task(sample_rss(pid, samples, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(session.run(reruns, think_time) for session in opened))
+        wall_time = time.perf_counter() - start
+        stop.set()
+        await sampler
+        after_reruns_mb = await settled_rss_mb(pid)
+    finally:
+        for session in opened:
+            session.close()
+
+    # The first session also pays for loading the data and the imports; the slope from
+    # there on is what each additional session costs
+    per_session_mb = slope(list(range(1, sessions + 1)), ramp_mb)
+    return {
+        "wall_time_s": wall_time,
+        "sessions": opened,
+        "memory": {
+            "server_idle_mb": idle_mb,
+            "server_after_sessions_mb": ramp_mb,
+            "per_additional_session_mb": per_session_mb,
+            # Sessions still connected; includes what their section caches grew to
+            "server_after_reruns_mb": after_reruns_mb,
+            "server_peak_mb": max(samples + ramp_mb),
+        },
+    }
+
+
+def run_load_test(app, sessions, reruns, seed, timeout, think_time=0.0, port=8598, env=None):
+    server = start_server(app, port, {**os.environ, **(env or {})}, timeout)
+    try:
+        result = asyncio.run(drive(f"ws://127.0.0.1:{port}", server.pid, sessions, reruns, seed, timeout, think_time))
+    finally:
+        stop_server(server)
+
+    opened = result["sessions"]
+    all_latencies = [latency for session in opened for latency in session.latencies]
+    return {
+        "app": app,
+        "sessions": sessions,
+        "reruns_per_session": reruns,
+        "think_time_s": think_time,
+        "wall_time_s": result["wall_time_s"],
+        "throughput_reruns_per_s": len(all_latencies) / result["wall_time_s"],
+        "errors": sum(session.errors for session in opened),
+        "overall": {
+            "first_run_p50_ms": percentile([session.first_run for session in opened], 50) * 1000,
+            "p50_ms": percentile(all_latencies, 50) * 1000,
+            "p95_ms": percentile(all_latencies, 95) * 1000,
+            "p99_ms": percentile(all_latencies, 99) * 1000,
+        },
+        "memory": result["memory"],
+        "per_session": [
+            {
+                "session": index,
+                "first_run_ms": session.first_run * 1000,
+                "p50_ms": percentile(session.latencies, 50) * 1000,
+                "p95_ms": percentile(session.latencies, 95) * 1000,
+                "p99_ms": percentile(session.latencies, 99) * 1000,
+                "errors": session.errors,
+            }
+            for index, session in enumerate(opened)
+        ],
+    }
+
+
+def print_report(report, rows):
+    overall, memory = report["overall"], report["memory"]
+    print(f"{report['app']}: {report['sessions']} concurrent sessions x {report['reruns_per_session']} reruns "
+          f"on one server, {rows or 'default'} rows, think time {report['think_time_s']:.1f}s")
+    print(f"  wall time {report['wall_time_s']:.1f}s, throughput {report['throughput_reruns_per_s']:.2f} reruns/s, "
+          f"errors {report['errors']}")
+    print(f"  rerun latency p50 {overall['p50_ms']:.0f} ms, p95 {overall['p95_ms']:.0f} ms, p99 {overall['p99_ms']:.0f} ms "
+          f"(first run p50 {overall['first_run_p50_ms']:.0f} ms)")
+    per_session = memory["per_additional_session_mb"]
+    print(f"  server RSS idle {memory['server_idle_mb']:.0f} MB, peak {memory['server_peak_mb']:.0f} MB, "
+          f"after the reruns {memory['server_after_reruns_mb']:.0f} MB")
+    print(f"  per additional session (first page load) {'n/a' if per_session is None else f'{per_session:.1f} MB'}")
+    print("  after N sessions: " + ", ".join(f"{n}: {mb:.0f} MB"
+                                             for n, mb in enumerate(memory["server_after_sessions_mb"], 1)))
+    print(f"  {'session':>7} {'first':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>6}")
+    for session in report["per_session"]:
+        print(f"  {session['session']:>7} {session['first_run_ms']:>8.0f} {session['p50_ms']:>8.0f} "
+              f"{session['p95_ms']:>8.0f} {session['p99_ms']:>8.0f} {session['errors']:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session load test for the Superstore dashboards")
+    parser.add_argument("--app", default="app2.py", choices=["app1.py", "app2.py"])
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--reruns", type=int, default=20, help="reruns per session after the first load")
+    parser.add_argument("--rows", type=int, default=None, help="dataset size; the export is replicated to reach it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="mean seconds a session waits between reruns (0: back to back, the worst case)")
+    parser.add_argument("--port", type=int, default=8598, help="port for the `streamlit run` server under test")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed for startup and per rerun")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        data = scaled_dataset(args.rows, directory) if args.rows else SOURCE_CSV
+        report = run_load_test(args.app, args.sessions, args.reruns, args.seed, args.timeout,
+                               think_time=args.think, port=args.port, env={"SUPERSTORE_DATA": str(data)})
+
+    report["rows"] = args.rows
+    print_report(report, args.rows)
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump(report, output, indent=2)
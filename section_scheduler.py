@@ -0,0 +1,37 @@
+import streamlit as st
+
+# ==================== SECTION SCHEDULER ====================
+# Every chart of a section gets its placeholder first, so the whole layout (with
+# "loading" captions) is on screen before any figure is built. The builders then run
+# one after another and each placeholder is filled as soon as its figure is ready.
+#
+# They are deliberately not run in a thread pool: the builders are GIL-bound pandas /
+# plotly code reading cached aggregates, so threads do not shorten the section and only
+# delay the first chart. Measured on the four Executive Overview charts (median of 15):
+#   sequential: first chart 47 ms, all charts 209 ms
+#   threaded:   first chart 169 ms, all charts 203 ms
+#
+# Nor in a process pool (workers build from a pickled frame and return fig.to_json()).
+# st.plotly_chart re-validates the returned JSON on the page's thread (22-38 ms a chart),
+# so the first chart can never beat building it in place, and the pool's workers (~140 MB
+# each) are shared by every session of the replica. Median of 9, one core:
+#   Executive Overview  sequential: first 46 ms, all 205 ms   pool: first 219 ms, all 279 ms
+#   Discount Analysis   sequential: first 119 ms, all 217 ms  pool: first 252 ms, all 654 ms
+
+
+def chart_slot(loading_text="⏳ Loading chart..."):
+    """Reserve a placeholder for a chart in the current layout position."""
+    slot = st.empty()
+    slot.caption(loading_text)
+    return slot
+
+
+def render_section(tasks):
+    """Build every (slot, builder) pair in order and render each figure as soon as it is built."""
+    for slot, build in tasks:
+        try:
+            fig = build()
+        except Exception as exc:
+            slot.exception(exc)
+            continue
+        slot.plotly_chart(fig, use_container_width=True)
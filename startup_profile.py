@@ -0,0 +1,207 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+# ==================== STARTUP PROFILE ====================
+# The dashboards import plotly, statsmodels and the section modules (customer_features,
+# discount_simulator, forecasting) only in the sections that use them, so a fresh server
+# process answers the landing page without paying for them. After the first page is
+# rendered, warm_imports() loads them in a background thread so later sections stay fast.
+#
+# Run as a script to measure it:
+#
+#   python startup_profile.py --app app2.py --repeat 3
+#
+# which reports the cold import time of each module (fresh interpreter per sample), the
+# first render of the landing page in a fresh process (and which heavy modules it pulled
+# in), and for `streamlit run`: time until /_stcore/health answers and time to first byte.
+# Only the standard library may be imported at the top of this module.
+
+ROOT = Path(__file__).resolve().parent
+
+# Loaded lazily by the sections, warmed in the background after the first render
+HEAVY_MODULES = [
+    "plotly.express",
+    "plotly.graph_objects",
+    "statsmodels.api",  # trendline="ols" in Discount Analysis
+    "customer_features",
+    "discount_simulator",
+    "forecasting",
+]
+
+# Reported by the profiler; the first group is needed by every page
+PROFILED_MODULES = [
+    "streamlit",
+    "pandas",
+    "numpy",
+    "superstore_data",
+    "incremental_aggregates",
+    "section_scheduler",
+] + HEAVY_MODULES
+
+logger = logging.getLogger("superstore.startup")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s: %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_warm_lock = threading.Lock()
+_warm_started = False
+_rendered_sections = set()
+
+
+# ==================== IN-APP HOOKS ====================
+def log_render(section, started):
+    # The first render of a section in a process includes its lazy imports
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if section in _rendered_sections:
+        logger.debug("rerun of %s rendered in %.0f ms", section, elapsed_ms)
+    else:
+        _rendered_sections.add(section)
+        logger.info("first render of %s in %.0f ms", section, elapsed_ms)
+
+
+def warm_imports(modules=HEAVY_MODULES):
+    """Import the heavy modules once per process in a daemon thread."""
+    global _warm_started
+    with _warm_lock:
+        # SUPERSTORE_WARM_IMPORTS=0 turns it off, e.g. to see what a page imports by itself
+        if _warm_started or os.environ.get("SUPERSTORE_WARM_IMPORTS") == "0":
+            return
+        _warm_started = True
+    threading.Thread(target=_import_all, args=(list(modules),), name="warm-imports", daemon=True).start()
+
+
+def _import_all(modules):
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as exc:
+            logger.warning("could not warm %s: %s", name, exc)
+            continue
+        logger.info("warmed %s in %.0f ms", name, (time.perf_counter() - started) * 1000)
+
+
+# ==================== PROFILER ====================
+def cold_import_ms(module, repeat=3):
+    # A fresh interpreter per sample, so nothing is already in sys.modules
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        samples.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return statistics.median(samples)
+
+
+def print_first_render(app, timeout):
+    # Runs in a child process (warm-up disabled): one AppTest run of the landing page
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / app), default_timeout=timeout)
+    at.run()
+    print(json.dumps({
+        "first_render_ms": (time.perf_counter() - started) * 1000,
+        "errors": len(at.exception),
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def first_render(app, timeout):
+    code = f"import startup_profile; startup_profile.print_first_render({app!r}, {timeout!r})"
+    env = dict(os.environ, SUPERSTORE_WARM_IMPORTS="0")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def server_startup(app, port, timeout):
+    # Time until `streamlit run` answers its health check, then time to first byte of the page
+    command = [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+               "--server.port", str(port), "--browser.gatherUsageStats", "false"]
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready_ms = None
+        while time.perf_counter() - started < timeout and server.poll() is None:
+            try:
+                with urllib.request.urlopen(f"{base}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        ready_ms = (time.perf_counter() - started) * 1000
+                        break
+            except OSError:
+                time.sleep(0.05)
+        if ready_ms is None:
+            return {"error": "server did not become healthy"}
+        request_started = time.perf_counter()
+        with urllib.request.urlopen(f"{base}/", timeout=timeout) as response:
+            response.read(1)
+            first_byte_ms = (time.perf_counter() - request_started) * 1000
+        return {"ready_ms": ready_ms, "first_byte_ms": first_byte_ms}
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def print_report(report):
+    print(f"{report['app']}: startup profile (median of {report['repeat']} cold imports)")
+    print(f"  {'module':<24} {'import ms':>10}")
+    for name, elapsed in report["imports"].items():
+        print(f"  {name:<24} {'failed' if elapsed is None else f'{elapsed:.0f}':>10}")
+    render = report["first_render"]
+    if "error" in render:
+        print(f"  landing page render: {render['error']}")
+    else:
+        print(f"  landing page first render {render['first_render_ms']:.0f} ms, errors {render['errors']}, "
+              f"heavy modules loaded: {', '.join(render['heavy_modules_loaded']) or 'none'}")
+    server = report.get("server")
+    if server is None:
+        return
+    if "error" in server:
+        print(f"  streamlit run: {server['error']}")
+    else:
+        print(f"  streamlit run: healthy after {server['ready_ms']:.0f} ms, first byte of / in {server['first_byte_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup and import time profile of the Superstore dashboards")
+    parser.add_argument("--app", default="app2.py", choices=["app1.py", "app2.py"])
+    parser.add_argument("--repeat", type=int, default=3, help="cold import samples per module")
+    parser.add_argument("--port", type=int, default=8599, help="port for the temporary `streamlit run` server")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed for the render / server start")
+    parser.add_argument("--skip-server", action="store_true", help="do not start `streamlit run`")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "app": args.app,
+        "repeat": args.repeat,
+        "imports": {name: cold_import_ms(name, args.repeat) for name in PROFILED_MODULES},
+        "first_render": first_render(args.app, args.timeout),
+    }
+    if not args.skip_server:
+        report["server"] = server_startup(args.app, args.port, args.timeout)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump(report, output, indent=2)
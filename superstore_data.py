@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ==================== CONFIG ====================
+# Shared by the Streamlit dashboards (app1.py / app2.py) and the headless API (api_server.py),
+# so none of this module may import streamlit.
+DATA_PATH = os.environ.get("SUPERSTORE_DATA", "final_data_superstore.csv")
+# Directory or JSON manifest of several exports to merge instead (see ingest.py)
+SOURCES = os.environ.get("SUPERSTORE_SOURCES")
+
+STATE_CODES = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
+    'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'District of Columbia': 'DC',
+    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL',
+    'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA',
+    'Maine': 'ME', 'Maryland': 'MD', 'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN',
+    'Mississippi': 'MS', 'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
+    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
+    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
+    'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
+    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT',
+    'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY'
+}
+
+MONTH_ORDER = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+
+# 0 for no discount, 0-0.2 low, 0.2-0.5 medium, >0.5 high
+DISCOUNT_BINS = [-0.01, 0.001, 0.2, 0.5, 1.0]
+
+LABELS = {
+    "en": {
+        "discounted": ("Yes", "No"),
+        "discount_levels": ['No Discount', 'Low Discount', 'Medium Discount', 'High Discount'],
+    },
+    "id": {
+        "discounted": ("Ya", "Tidak"),
+        "discount_levels": ['Tanpa Diskon', 'Diskon Rendah', 'Diskon Sedang', 'Diskon Tinggi'],
+    },
+}
+
+PIVOT_DIMENSIONS = ["Region", "State", "Ship Mode", "Segment", "Category", "Sub-Category", "Order_Year", "Discount_Level"]
+PIVOT_MEASURES = ["Sales", "Profit", "Quantity", "Profit Margin", "Orders"]
+NATURAL_ORDER_DIMENSIONS = {"Order_Year", "Discount_Level"}
+OTHER_LABEL = "Other"
+
+# Sidebar filter name -> column it selects on
+FILTER_COLUMNS = {
+    "regions": "Region",
+    "years": "Order_Year",
+    "categories": "Category",
+    "segments": "Segment",
+}
+
+
+# ==================== LOAD DATA ====================
+def load_data(path=DATA_PATH, lang="en", sources=SOURCES):
+    if sources:
+        from ingest import ingest
+        return add_derived_columns(ingest(sources), lang=lang)
+    df = pd.read_csv(path, encoding='ISO-8859-1', parse_dates=["Order Date", "Ship Date"])
+    return add_derived_columns(df, lang=lang)
+
+
+def add_derived_columns(df, lang="en"):
+    labels = LABELS[lang]
+    yes, no = labels["discounted"]
+    df["Profit Margin"] = df["Profit"] / df["Sales"]
+    df["Profit_Per_Quantity"] = df["Profit"] / df["Quantity"]
+    df["Discounted"] = np.where(df["Discount"] > 0, yes, no)
+    df["Order_Month"] = df["Order Date"].dt.strftime("%B")
+    df["Order_Day"] = df["Order Date"].dt.day
+    df["Order_Year"] = df["Order Date"].dt.year
+    df["State Code"] = df["State"].map(STATE_CODES)
+
+    # Categorize discount levels for better analysis
+    df['Discount_Level'] = pd.cut(df['Discount'], bins=DISCOUNT_BINS, labels=labels["discount_levels"], right=True)
+
+    df.attrs["data_version"] = data_version(df)
+    return df
+
+
+def data_version(df):
+    # Content hash of the order lines, used to key caches and API ETags
+    hashed = pd.util.hash_pandas_object(df[["Row ID", "Order ID", "Sales", "Profit", "Discount"]], index=False)
+    return hashlib.sha1(hashed.values.tobytes()).hexdigest()[:16]
+
+
+# ==================== FILTER ====================
+def filter_mask(df, regions=None, years=None, categories=None, segments=None):
+    # None leaves a dimension unfiltered; an empty list selects nothing, like an empty multiselect
+    mask = pd.Series(True, index=df.index)
+    for name, values in (("regions", regions), ("years", years), ("categories", categories), ("segments", segments)):
+        if values is not None:
+            mask &= df[FILTER_COLUMNS[name]].isin(values)
+    return mask
+
+
+def select_rows(df, regions=None, years=None, categories=None, segments=None):
+    return RowSelection(df, filter_mask(df, regions=regions, years=years, categories=categories, segments=segments))
+
+
+class RowSelection:
+    """Lazy view of the filtered rows: row positions plus the shared base frame.
+
+    Columns are copied out of the base frame only when a section asks for them, once per
+    rerun, instead of materializing every column of every selected row up front.
+    """
+
+    def __init__(self, base, mask):
+        self.base = base
+        self.rows = np.flatnonzero(mask.to_numpy())
+        self.attrs = base.attrs
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        return len(self.rows) == 0
+
+    @property
+    def selects_all(self):
+        return len(self.rows) == len(self.base)
+
+    def column(self, name):
+        if name not in self._columns:
+            # With nothing filtered out the base column is used as is, without a copy
+            self._columns[name] = self.base[name] if self.selects_all else self.base[name].iloc[self.rows]
+        return self._columns[name]
+
+    def frame(self, columns):
+        columns = list(dict.fromkeys(columns))
+        if self.selects_all:
+            return self.base[columns]
+        return pd.DataFrame({name: self.column(name) for name in columns}, copy=False)
+
+
+# ==================== AGGREGATIONS ====================
+# Every chart and API number is derived from additive group sums (plus a row count) by
+# the views below. The dashboard keeps the sums per session and updates them by filter
+# deltas (incremental_aggregates.py); the API groups the selected rows directly.
+
+# name -> (group keys, summed columns)
+AGGREGATE_SPECS = {
+    "yearly": (["Order_Year"], ["Sales", "Profit", "Profit Margin"]),
+    "monthly": (["Order_Month"], ["Sales", "Profit", "Profit Margin"]),
+    "region": (["Region"], ["Profit"]),
+    "segment": (["Segment"], ["Sales", "Profit"]),
+    "category": (["Category", "Sub-Category"], ["Sales", "Profit"]),
+    "product": (["Product Name"], ["Profit"]),
+    "customer": (["Customer Name"], ["Profit"]),
+    "state": (["State", "State Code"], ["Profit"]),
+    "discount_level": (["Discount_Level"], ["Sales", "Profit"]),
+}
+
+ROW_COUNT = "_rows"
+
+
+def group_sums(rows, keys, columns):
+    grouped = rows.groupby(keys, observed=True, sort=False)
+    sums = grouped[columns].sum()
+    sums[ROW_COUNT] = grouped.size()
+    return sums
+
+
+def aggregate_sums(df, name):
+    keys, columns = AGGREGATE_SPECS[name]
+    return group_sums(df[keys + columns], keys, columns)
+
+
+def summed(sums, columns, order=None):
+    frame = sums[list(columns)]
+    frame = frame.sort_index() if order is None else frame.reindex(order).rename_axis(sums.index.name)
+    return frame.reset_index()
+
+
+def averaged(sums, columns, order=None):
+    means = sums[list(columns)].div(sums[ROW_COUNT], axis=0)
+    means = means.sort_index() if order is None else means.reindex(order).rename_axis(sums.index.name)
+    return means.reset_index()
+
+
+def ranked(sums, column, n=10, ascending=False):
+    return sums[column].sort_values(ascending=ascending).head(n).reset_index()
+
+
+def kpi_totals(totals, orders):
+    # totals: any frame whose Sales/Profit columns add up to the selection's totals
+    sales = float(totals["Sales"].sum())
+    profit = float(totals["Profit"].sum())
+    return {
+        "sales": sales,
+        "profit": profit,
+        "profit_margin": profit / sales if sales else 0,
+        "orders": int(orders),
+    }
+
+
+def kpis(df):
+    return kpi_totals(df, df['Order ID'].nunique())
+
+
+def subcategory_profit_pivot(df):
+    return pivot_grid(sparse_pivot(df, "Sub-Category", "Category", "Profit", row_limit=None, column_limit=None),
+                      "Sub-Category", "Category", "Profit")
+
+
+# ==================== SPARSE PIVOTS ====================
+# Pivots are computed as a long table holding only the non-empty cells. High-cardinality
+# dimensions keep their top (limit - 1) values by magnitude of the measure and fold the
+# rest into an "Other" bucket, so e.g. State x Sub-Category stays a few hundred cells.
+def _measure(grouped, measure):
+    if measure == "Orders":
+        return grouped["Order ID"].nunique()
+    if measure == "Profit Margin":
+        sums = grouped[["Profit", "Sales"]].sum()
+        return sums["Profit"] / sums["Sales"]
+    return grouped[measure].sum()
+
+
+def _ranked_labels(df, dim, measure, limit):
+    # A ratio is ranked by the volume behind it, not by the ratio itself
+    rank_measure = "Sales" if measure == "Profit Margin" else measure
+    totals = _measure(df.groupby(dim, observed=True), rank_measure)
+    if limit and len(totals) > limit:
+        keep = totals.abs().nlargest(limit - 1).index
+    else:
+        keep = totals.index
+    if dim in NATURAL_ORDER_DIMENSIONS:
+        kept = set(keep)
+        keep = [value for value in totals.index if value in kept]
+    else:
+        keep = list(totals.loc[keep].abs().sort_values(ascending=False).index)
+
+    if len(keep) == len(totals):
+        return pd.Categorical(df[dim], categories=keep, ordered=True)
+    labels = df[dim].astype(str).where(df[dim].isin(keep), OTHER_LABEL)
+    return pd.Categorical(labels, categories=[str(value) for value in keep] + [OTHER_LABEL], ordered=True)
+
+
+def sparse_pivot_columns(rows, columns, measure="Profit", facet=None):
+    # Source columns sparse_pivot() reads, so callers can materialize just these
+    measure_columns = {"Orders": ["Order ID"], "Profit Margin": ["Profit", "Sales"]}.get(measure, [measure])
+    return [dim for dim in (rows, columns, facet) if dim] + measure_columns + ["Sales"]
+
+
+def validate_pivot(rows, columns, measure="Profit", facet=None):
+    # Checked before any column is looked up, so bad input is a ValueError and not a KeyError
+    names = [dim for dim in (rows, columns, facet) if dim]
+    if len(set(names)) != len(names):
+        raise ValueError("pivot dimensions must be different")
+    for name in names:
+        if name not in PIVOT_DIMENSIONS:
+            raise ValueError(f"unknown pivot dimension {name!r}")
+    if measure not in PIVOT_MEASURES:
+        raise ValueError(f"unknown pivot measure {measure!r}")
+
+
+def sparse_pivot(df, rows, columns, measure="Profit", facet=None, row_limit=20, column_limit=12, facet_limit=12):
+    validate_pivot(rows, columns, measure=measure, facet=facet)
+    dims = [(rows, row_limit), (columns, column_limit)] + ([(facet, facet_limit)] if facet else [])
+    keys = [pd.Series(_ranked_labels(df, dim, measure, limit), index=df.index, name=dim) for dim, limit in dims]
+    return _measure(df.groupby(keys, observed=True), measure).rename(measure).reset_index()
+
+
+def pivot_grid(long, rows, columns, measure):
+    # Empty cells stay NaN instead of being reported as a zero
+    grid = long.pivot(index=rows, columns=columns, values=measure)
+    grid = grid.dropna(how="all").dropna(axis=1, how="all")
+    grid.index = grid.index.astype(object)
+    grid.columns = grid.columns.astype(object)
+    return grid
+
+
+def to_records(frame):
+    # Round-trip through pandas' JSON writer so NaN becomes null and numpy scalars become plain numbers
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+# Source columns dashboard_aggregates() reads
+DASHBOARD_AGGREGATE_COLUMNS = ["Sales", "Profit", "Order ID", "Product Name", "Customer Name", "State", "State Code", "Discount_Level"]
+
+
+def dashboard_aggregates(df, top_n=10):
+    # The same views the dashboard sections draw, over sums grouped from the selected rows
+    products = aggregate_sums(df, "product")
+    return {
+        "kpis": kpis(df),
+        "top_products": to_records(ranked(products, "Profit", n=top_n)),
+        "worst_products": to_records(ranked(products, "Profit", n=top_n, ascending=True)),
+        "top_customers": to_records(ranked(aggregate_sums(df, "customer"), "Profit", n=top_n)),
+        "state_profit": to_records(summed(aggregate_sums(df, "state"), ["Profit"])),
+        "discount_levels": to_records(averaged(aggregate_sums(df, "discount_level"), ["Sales", "Profit"],
+                                               order=df["Discount_Level"].cat.categories)),
+    }
@@ -0,0 +1,65 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from api_server import AggregateCache, AggregateHandler
+
+
+@pytest.fixture(scope="module")
+def base_url(df):
+    AggregateHandler.cache = AggregateCache(df)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AggregateHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(base_url, path):
+    try:
+        with urllib.request.urlopen(base_url + path, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def post(base_url, path, body):
+    request = urllib.request.Request(base_url + path, data=body.encode(), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def test_pivot(base_url):
+    status, payload = get(base_url, "/pivot?rows=State&columns=Category&measure=Sales&region=West")
+    assert status == 200
+    assert payload["cells"] and set(payload["cells"][0]) == {"State", "Category", "Sales"}
+
+
+@pytest.mark.parametrize("query", [
+    "rows=Foo",
+    "columns=Bogus",
+    "measure=Bogus",
+    "facet=Nope",
+    "rows=Region&columns=Region",
+    "row_limit=0",
+    "row_limit=abc",
+])
+def test_bad_pivot_parameters_are_a_400(base_url, query):
+    status, payload = get(base_url, f"/pivot?{query}")
+    assert status == 400
+    assert "error" in payload
+
+
+@pytest.mark.parametrize("body", ["[1, 2]", '{"filters": [{"region": {"a": 1}}]}', '{"filters": {}}', "not json"])
+def test_bad_batch_bodies_are_a_400(base_url, body):
+    status, payload = post(base_url, "/aggregates/batch", body)
+    assert status == 400
+    assert "error" in payload
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from customer_features import CustomerFeatureStore, build_customer_features, update_customer_features
+from superstore_data import data_version
+
+
+def versioned(df):
+    df = df.copy()
+    df.attrs["data_version"] = data_version(df)
+    return df
+
+
+def assert_same_features(actual, expected):
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_dtype=False)
+
+
+def test_update_equals_a_build_over_the_union(df):
+    # Split by whole orders: update_customer_features only folds in orders it has not seen
+    early = df["Order ID"].isin(df["Order ID"].unique()[:400])
+    a, b = df[early], df[~early]
+    assert_same_features(update_customer_features(build_customer_features(a), b),
+                         build_customer_features(pd.concat([a, b])))
+
+
+def test_store_folds_in_appended_orders(df):
+    early = df["Order ID"].isin(df["Order ID"].unique()[:400])
+    store = CustomerFeatureStore()
+    store.refresh(versioned(df[early]))
+    assert_same_features(store.refresh(versioned(df)), build_customer_features(df))
+
+
+def test_store_rebuilds_when_seen_orders_change(df):
+    store = CustomerFeatureStore()
+    store.refresh(versioned(df))
+
+    # Orders removed: a later export that covers fewer years
+    shrunk = versioned(df[df["Order_Year"] < df["Order_Year"].max()])
+    assert_same_features(store.refresh(shrunk), build_customer_features(shrunk))
+
+    # A seen order line edited in place, plus new orders
+    edited = versioned(df)
+    edited.loc[edited.index[0], "Sales"] += 1000
+    assert_same_features(store.refresh(edited), build_customer_features(edited))
@@ -0,0 +1,90 @@
+import random
+
+import pandas as pd
+import pytest
+
+from incremental_aggregates import IncrementalAggregates
+from superstore_data import AGGREGATE_SPECS, FILTER_COLUMNS, ROW_COUNT, filter_mask
+
+
+def all_values(df):
+    return {name: sorted(df[column].unique()) for name, column in FILTER_COLUMNS.items()}
+
+
+def expected_sums(df, selection, name):
+    keys, columns = AGGREGATE_SPECS[name]
+    rows = df[filter_mask(df, **selection)]
+    grouped = rows.groupby(keys, observed=True)
+    expected = grouped[columns].sum()
+    expected[ROW_COUNT] = grouped.size()
+    return expected
+
+
+def assert_matches_groupby(aggregates, df, selection):
+    for name in AGGREGATE_SPECS:
+        actual = aggregates.sums(name).sort_index()
+        expected = expected_sums(df, selection, name).sort_index()
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False,
+                                      check_categorical=False, rtol=1e-9)
+
+
+def bind(aggregates, df, selection):
+    return aggregates.bind(df, {name: list(values) for name, values in selection.items()})
+
+
+def test_single_filter_changes_use_the_delta(df):
+    values = all_values(df)
+    aggregates = bind(IncrementalAggregates(), df, values)
+    assert_matches_groupby(aggregates, df, values)
+
+    selection = dict(values, regions=[region for region in values["regions"] if region != "West"])
+    bind(aggregates, df, selection)
+    assert_matches_groupby(aggregates, df, selection)
+    assert all(entry["updates"] == 1 for entry in aggregates._entries.values())
+
+    selection = dict(selection, years=values["years"][1:])
+    bind(aggregates, df, selection)
+    assert_matches_groupby(aggregates, df, selection)
+
+
+def test_emptying_a_filter_and_restoring_it(df):
+    values = all_values(df)
+    aggregates = bind(IncrementalAggregates(), df, values)
+    aggregates.sums("product")
+
+    emptied = dict(values, categories=[])
+    bind(aggregates, df, emptied)
+    assert aggregates.sums("product").empty
+    assert_matches_groupby(aggregates, df, emptied)
+
+    bind(aggregates, df, values)
+    assert_matches_groupby(aggregates, df, values)
+
+
+def test_several_filters_changed_at_once(df):
+    values = all_values(df)
+    aggregates = bind(IncrementalAggregates(), df, values)
+    assert_matches_groupby(aggregates, df, values)
+
+    selection = dict(values, regions=["East", "South"], segments=["Corporate"], years=values["years"][:2])
+    bind(aggregates, df, selection)
+    assert_matches_groupby(aggregates, df, selection)
+    assert all(entry["updates"] == 0 for entry in aggregates._entries.values())
+
+
+@pytest.mark.parametrize("max_incremental_updates", [50, 3])
+def test_random_toggles_match_a_full_recompute(df, max_incremental_updates):
+    rng = random.Random(max_incremental_updates)
+    values = all_values(df)
+    selection = {name: list(options) for name, options in values.items()}
+    aggregates = bind(IncrementalAggregates(max_incremental_updates=max_incremental_updates), df, selection)
+
+    for _ in range(60):
+        for name in rng.sample(list(values), rng.choice([1, 1, 1, 2])):
+            value = rng.choice(values[name])
+            if value in selection[name]:
+                selection[name] = [v for v in selection[name] if v != value]
+            else:
+                selection[name] = [v for v in values[name] if v in selection[name] or v == value]
+        bind(aggregates, df, selection)
+        assert_matches_groupby(aggregates, df, selection)